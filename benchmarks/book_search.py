@@ -0,0 +1,113 @@
+'''Query plans and timings for book search, with and without its indexes.
+
+Seeds a scratch copy of books (1M rows by default) in a separate schema
+with the same generated search_vector column as the books table, then
+runs the full-text, prefix and fuzzy (misspelt) searches issued by
+GET /api/v1/books/search before and after creating the GIN indexes of
+migration 8c41e6b9d2f3. Needs a reachable DATABASE_URL.
+
+    python -m benchmarks.book_search --rows 1000000
+'''
+import argparse
+import asyncio
+import time
+
+import asyncpg
+
+from src.books.models import SEARCH_VECTOR_EXPRESSION
+from src.config import Config
+
+SCHEMA = 'bookly_bench'
+
+WORDS = ['river', 'shadow', 'garden', 'winter', 'empire', 'silent', 'glass', 'harbor', 'crimson', 'orchard']
+
+SEARCH = f'''
+    SELECT uid, title, author,
+           greatest(ts_rank(search_vector, websearch_to_tsquery('simple', $1)),
+                    similarity(title, $1), similarity(author, $1)) AS rank
+    FROM {SCHEMA}.books
+    WHERE search_vector @@ websearch_to_tsquery('simple', $1)
+       OR title ILIKE $1 || '%'
+       OR title % $1
+       OR author % $1
+    ORDER BY rank DESC, uid
+    LIMIT 20
+'''
+
+QUERIES = [
+    ('full-text', 'winter garden'),
+    ('prefix', 'Crimson Orch'),
+    ('misspelt', 'Shadw Harbr'),
+]
+
+
+async def seed(conn: asyncpg.Connection, rows: int) -> None:
+    await conn.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    await conn.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+    await conn.execute(f'CREATE SCHEMA {SCHEMA}')
+    await conn.execute(
+        f'''
+        CREATE TABLE {SCHEMA}.books (
+            uid uuid PRIMARY KEY,
+            title varchar NOT NULL,
+            author varchar NOT NULL,
+            publisher varchar NOT NULL,
+            search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPRESSION}) STORED
+        )
+        '''
+    )
+    await conn.execute(
+        f'''
+        INSERT INTO {SCHEMA}.books (uid, title, author, publisher)
+        SELECT gen_random_uuid(),
+               initcap(w[1 + i % 10] || ' ' || w[1 + (i / 10) % 10] || ' ' || w[1 + (i / 100) % 10]) || ' ' || i,
+               'Author ' || (i % 5000), 'Publisher ' || (i % 50)
+        FROM generate_series(1, $1) AS i, (SELECT $2::text[] AS w) AS words
+        ''',
+        rows,
+        WORDS,
+    )
+    await conn.execute(f'ANALYZE {SCHEMA}.books')
+
+
+async def measure(conn: asyncpg.Connection, label: str, query: str, *args: object) -> None:
+    plan = await conn.fetch(f'EXPLAIN (ANALYZE, BUFFERS) {query}', *args)
+    timings = []
+    for _ in range(10):
+        start = time.perf_counter()
+        await conn.fetch(query, *args)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    print(f'--- {label}: median {timings[len(timings) // 2] * 1000:.2f}ms')
+    for row in plan:
+        print('   ', row[0])
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(Config.DATABASE_URL.replace('postgresql+asyncpg', 'postgresql'))
+    try:
+        print(f'Seeding {args.rows} books...')
+        await seed(conn, args.rows)
+
+        for label, term in QUERIES:
+            await measure(conn, f'{label} {term!r}, no index', SEARCH, term)
+
+        await conn.execute(f'CREATE INDEX ON {SCHEMA}.books USING gin (search_vector)')
+        await conn.execute(f'CREATE INDEX ON {SCHEMA}.books USING gin (title gin_trgm_ops)')
+        await conn.execute(f'CREATE INDEX ON {SCHEMA}.books USING gin (author gin_trgm_ops)')
+        await conn.execute(f'ANALYZE {SCHEMA}.books')
+
+        for label, term in QUERIES:
+            await measure(conn, f'{label} {term!r}, indexed', SEARCH, term)
+    finally:
+        await conn.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+        await conn.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
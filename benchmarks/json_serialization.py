@@ -0,0 +1,77 @@
+'''CPU cost of turning a page of Book rows into a JSON response body.
+
+Builds Book ORM instances in memory (no database) and serializes them the
+way each response path does: FastAPI's response_model validation followed
+by the stdlib JSON encoder, the same with orjson as response class, and
+a single pass through the prebuilt TypeAdapter, which is what endpoints
+returning a ready Response use.
+
+    python -m benchmarks.json_serialization --rows 1000 10000 100000
+'''
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import date, datetime
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from src.books.models import Book
+from src.books.schemas import BookModel, book_list_adapter
+
+response_field = create_model_field(name='Response', type_=List[BookModel], mode='serialization')
+
+
+def make_books(rows: int) -> list[Book]:
+    now = datetime.utcnow()
+    return [
+        Book(uid=uuid.uuid4(), title=f'Title {i}', author=f'Author {i % 5000}', publisher='Publisher',
+             published_date=date(2000, 1, 1), page_count=100 + i % 900, language='en',
+             version=1, created_at=now, updated_at=now)
+        for i in range(rows)
+    ]
+
+
+async def response_model_json(books: list[Book]) -> bytes:
+    content = await serialize_response(field=response_field, response_content=books)
+    return JSONResponse(content).body
+
+
+async def response_model_orjson(books: list[Book]) -> bytes:
+    content = await serialize_response(field=response_field, response_content=books)
+    return ORJSONResponse(content).body
+
+
+async def type_adapter(books: list[Book]) -> bytes:
+    return book_list_adapter.dump_json(book_list_adapter.validate_python(books, from_attributes=True))
+
+
+async def measure(label: str, serialize: Callable, books: list[Book], repeat: int) -> None:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = await serialize(books)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f'    {label:<32} median {timings[len(timings) // 2] * 1000:9.2f}ms  {len(body)}B')
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        books = make_books(rows)
+        print(f'--- {rows} rows')
+        await measure('response_model + json', response_model_json, books, args.repeat)
+        await measure('response_model + orjson', response_model_orjson, books, args.repeat)
+        await measure('TypeAdapter, no re-validation', type_adapter, books, args.repeat)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
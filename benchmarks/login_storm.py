@@ -0,0 +1,71 @@
+'''Event-loop latency of unrelated requests during a burst of sign-ins.
+
+A steady stream of cheap "unrelated" requests (standing in for any
+non-auth endpoint on the same worker) is due every few ms while a storm
+of bcrypt verifications runs, first inline on the event loop as /signin
+used to, then through the bounded password_hasher pool. Latency is how
+late each unrelated request is served relative to when it was due.
+
+    python -m benchmarks.login_storm --logins 40 --probes 400
+'''
+import argparse
+import asyncio
+import statistics
+import time
+
+from src.auth.utils import generate_password_hash, password_hasher, verify_password
+from src.errors import PasswordHasherBusy
+
+
+async def run_probes(count: int, interval: float, latencies: list[float]) -> None:
+    start = time.perf_counter()
+    for i in range(count):
+        due = start + i * interval
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        latencies.append(time.perf_counter() - due)
+
+
+async def inline_login(password: str, hashed: str) -> None:
+    verify_password(password, hashed)
+
+
+async def pooled_login(password: str, hashed: str) -> None:
+    try:
+        await password_hasher.verify(password, hashed)
+    except PasswordHasherBusy:
+        pass
+
+
+async def storm(mode: str, logins: int, probes: int, interval: float, hashed: str) -> list[float]:
+    login = inline_login if mode == 'inline' else pooled_login
+    latencies: list[float] = []
+    probe_task = asyncio.create_task(run_probes(probes, interval, latencies))
+    await asyncio.sleep(interval * 5)
+    await asyncio.gather(*(login('password123', hashed) for _ in range(logins)))
+    await probe_task
+    return latencies
+
+
+def report(mode: str, latencies: list[float]) -> None:
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f'{mode:>7}: p50={quantiles[49] * 1000:8.2f}ms '
+        f'p99={quantiles[98] * 1000:8.2f}ms max={max(latencies) * 1000:8.2f}ms'
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=40)
+    parser.add_argument('--probes', type=int, default=400)
+    parser.add_argument('--interval', type=float, default=0.005)
+    args = parser.parse_args()
+
+    hashed = generate_password_hash('password123')
+    for mode in ('inline', 'pooled'):
+        latencies = await storm(mode, args.logins, args.probes, args.interval, hashed)
+        report(mode, latencies)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+'''Query plans and timings for the hot lookups, with and without indexes.
+
+Seeds scratch copies of users and books (1M rows each by default) in a
+separate schema, then runs the email lookup used by signin/signup and
+the first page of the book listing before and after creating the same
+indexes as migration 3f9a2c7d41e8. Needs a reachable DATABASE_URL.
+
+    python -m benchmarks.lookup_indexes --rows 1000000
+'''
+import argparse
+import asyncio
+import time
+
+import asyncpg
+
+from src.config import Config
+
+SCHEMA = 'bookly_bench'
+
+EMAIL_LOOKUP = f'SELECT * FROM {SCHEMA}.users WHERE lower(email) = lower($1)'
+BOOKS_PAGE = f'SELECT * FROM {SCHEMA}.books ORDER BY created_at DESC, uid DESC LIMIT 51'
+
+
+async def seed(conn: asyncpg.Connection, rows: int) -> None:
+    await conn.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+    await conn.execute(f'CREATE SCHEMA {SCHEMA}')
+    await conn.execute(f'CREATE TABLE {SCHEMA}.users (LIKE public.users INCLUDING DEFAULTS)')
+    await conn.execute(f'CREATE TABLE {SCHEMA}.books (LIKE public.books INCLUDING DEFAULTS)')
+
+    await conn.execute(
+        f'''
+        INSERT INTO {SCHEMA}.users (uid, username, first_name, last_name, email,
+                                    role, is_verified, password_hash, created_at, updated_at)
+        SELECT gen_random_uuid(), 'user' || i, 'First', 'Last', 'User' || i || '@example.com',
+               'user', true, 'x', now(), now()
+        FROM generate_series(1, $1) AS i
+        ''',
+        rows,
+    )
+    await conn.execute(
+        f'''
+        INSERT INTO {SCHEMA}.books (uid, title, author, publisher, published_date,
+                                    page_count, language, created_at, updated_at)
+        SELECT gen_random_uuid(), 'Title ' || i, 'Author ' || (i % 5000), 'Publisher',
+               date '2000-01-01' + (i % 9000), 100 + i % 900, 'en',
+               now() - make_interval(secs => i), now()
+        FROM generate_series(1, $1) AS i
+        ''',
+        rows,
+    )
+    await conn.execute(f'ANALYZE {SCHEMA}.users')
+    await conn.execute(f'ANALYZE {SCHEMA}.books')
+
+
+async def measure(conn: asyncpg.Connection, label: str, query: str, *args: object) -> None:
+    plan = await conn.fetch(f'EXPLAIN (ANALYZE, BUFFERS) {query}', *args)
+    timings = []
+    for _ in range(20):
+        start = time.perf_counter()
+        await conn.fetch(query, *args)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    print(f'--- {label}: median {timings[len(timings) // 2] * 1000:.2f}ms')
+    for row in plan:
+        print('   ', row[0])
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(Config.DATABASE_URL.replace('postgresql+asyncpg', 'postgresql'))
+    try:
+        print(f'Seeding {args.rows} users and books...')
+        await seed(conn, args.rows)
+        email = f'user{args.rows // 2}@EXAMPLE.com'
+
+        await measure(conn, 'email lookup, no index', EMAIL_LOOKUP, email)
+        await measure(conn, 'books page, no index', BOOKS_PAGE)
+
+        await conn.execute(f'CREATE UNIQUE INDEX ON {SCHEMA}.users (lower(email))')
+        await conn.execute(f'CREATE INDEX ON {SCHEMA}.books (created_at DESC, uid DESC)')
+        await conn.execute(f'ANALYZE {SCHEMA}.users')
+        await conn.execute(f'ANALYZE {SCHEMA}.books')
+
+        await measure(conn, 'email lookup, indexed', EMAIL_LOOKUP, email)
+        await measure(conn, 'books page, indexed', BOOKS_PAGE)
+    finally:
+        await conn.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+        await conn.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
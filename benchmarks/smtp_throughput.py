@@ -0,0 +1,90 @@
+'''Emails per second over a local stand-in SMTP server.
+
+Starts a minimal SMTP sink on localhost (no TLS, accepts everything) and
+sends the same messages twice: once opening a connection per email, as
+the old send_email task did, and once over a single SMTPSession. Use
+--handshake-ms to mimic the network/TLS cost of greeting a real server.
+
+    python -m benchmarks.smtp_throughput --emails 500 --handshake-ms 50
+'''
+import argparse
+import asyncio
+import smtplib
+import threading
+import time
+
+from src.mail import SMTPSession, build_email
+
+
+class SinkServer:
+    def __init__(self, handshake_delay: float) -> None:
+        self.handshake_delay = handshake_delay
+        self.received = 0
+        self.port = 0
+        self._ready = threading.Event()
+
+    def start(self) -> None:
+        threading.Thread(target=asyncio.run, args=(self._serve(),), daemon=True).start()
+        self._ready.wait()
+
+    async def _serve(self) -> None:
+        server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await asyncio.sleep(self.handshake_delay)
+        writer.write(b'220 sink ready\r\n')
+        while line := await reader.readline():
+            command = line[:4].upper()
+            if command in (b'EHLO', b'HELO'):
+                writer.write(b'250 sink\r\n')
+            elif command == b'DATA':
+                writer.write(b'354 go ahead\r\n')
+                while (await reader.readline()) != b'.\r\n':
+                    pass
+                self.received += 1
+                writer.write(b'250 queued\r\n')
+            elif command == b'QUIT':
+                writer.write(b'221 bye\r\n')
+                break
+            else:
+                writer.write(b'250 ok\r\n')
+            await writer.drain()
+        writer.close()
+
+
+def connection_per_email(port: int, emails: int) -> None:
+    for i in range(emails):
+        with smtplib.SMTP('127.0.0.1', port) as smtp:
+            smtp.send_message(build_email([f'user{i}@example.com'], 'Verify Email', '<p>hi</p>'))
+
+
+def persistent_session(port: int, emails: int) -> None:
+    session = SMTPSession('127.0.0.1', port, None, None, starttls=False, timeout=10)
+    for i in range(emails):
+        session.send(build_email([f'user{i}@example.com'], 'Verify Email', '<p>hi</p>'))
+    session.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--emails', type=int, default=500)
+    parser.add_argument('--handshake-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    sink = SinkServer(args.handshake_ms / 1000)
+    sink.start()
+
+    for label, send in (('connection per email', connection_per_email), ('persistent session', persistent_session)):
+        before = sink.received
+        start = time.perf_counter()
+        send(sink.port, args.emails)
+        elapsed = time.perf_counter() - start
+        print(f'{label:>22}: {args.emails / elapsed:8.1f} emails/s ({sink.received - before} received)')
+
+
+if __name__ == '__main__':
+    main()
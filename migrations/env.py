@@ -29,6 +29,8 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 from src.auth.models import User # NEW
 from src.books.models import Book # NEW
+from src.outbox.models import OutboxMessage
+from src.reviews.models import BookRating, Review
 target_metadata = SQLModel.metadata # UPDATED
 
 # other values from the config, defined by the needs of env.py,
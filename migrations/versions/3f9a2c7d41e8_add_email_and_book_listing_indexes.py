@@ -0,0 +1,49 @@
+"""add email and book listing indexes
+
+Revision ID: 3f9a2c7d41e8
+Revises: b29f73cd132b
+Create Date: 2026-10-18 09:12:44.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel # NEW
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a2c7d41e8'
+down_revision: Union[str, None] = 'b29f73cd132b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # books was only ever created by init_db(), so bring it under migrations
+    # without failing on databases where it already exists.
+    if not sa.inspect(op.get_bind()).has_table('books'):
+        op.create_table('books',
+        sa.Column('uid', sa.Uuid(), nullable=False),
+        sa.Column('title', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('author', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('publisher', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('published_date', sa.Date(), nullable=False),
+        sa.Column('page_count', sa.Integer(), nullable=False),
+        sa.Column('language', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('created_at', postgresql.TIMESTAMP(), nullable=True),
+        sa.Column('updated_at', postgresql.TIMESTAMP(), nullable=True),
+        sa.PrimaryKeyConstraint('uid')
+        )
+
+    # Fails if existing rows differ only by email case; dedupe those first.
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=True)
+    op.create_index('ix_books_created_at_uid', 'books', [sa.text('created_at DESC'), sa.text('uid DESC')])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_books_created_at_uid', table_name='books')
+    op.drop_index('ix_users_email_lower', table_name='users')
+    # books is left in place: on most databases it predates this revision.
@@ -0,0 +1,32 @@
+"""add user_uid to books
+
+Revision ID: 9b7e4a1c3f06
+Revises: e61c2f8a9d47
+Create Date: 2026-10-18 19:10:42.981375
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9b7e4a1c3f06'
+down_revision: Union[str, None] = 'e61c2f8a9d47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing books keep a NULL owner; nothing records who added them.
+    op.add_column('books', sa.Column('user_uid', sa.Uuid(), nullable=True))
+    op.create_index(op.f('ix_books_user_uid'), 'books', ['user_uid'], unique=False)
+    op.create_foreign_key('books_user_uid_fkey', 'books', 'users', ['user_uid'], ['uid'], ondelete='SET NULL')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('books_user_uid_fkey', 'books', type_='foreignkey')
+    op.drop_index(op.f('ix_books_user_uid'), table_name='books')
+    op.drop_column('books', 'user_uid')
@@ -0,0 +1,28 @@
+"""add version to books
+
+Revision ID: d27b5e0a9c14
+Revises: 8c41e6b9d2f3
+Create Date: 2026-10-18 13:41:08.226731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd27b5e0a9c14'
+down_revision: Union[str, None] = '8c41e6b9d2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A constant default is metadata-only on Postgres 11+, so no table rewrite.
+    op.add_column('books', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('books', 'version')
@@ -0,0 +1,61 @@
+"""create reviews tables
+
+Revision ID: e61c2f8a9d47
+Revises: 5a0e3d8c7b21
+Create Date: 2026-10-18 18:02:37.514209
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel # NEW
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e61c2f8a9d47'
+down_revision: Union[str, None] = '5a0e3d8c7b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('reviews',
+    sa.Column('uid', sa.Uuid(), nullable=False),
+    sa.Column('book_uid', sa.Uuid(), nullable=False),
+    sa.Column('user_uid', postgresql.UUID(), nullable=False),
+    sa.Column('rating', sa.Integer(), nullable=False),
+    sa.Column('review_text', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('created_at', postgresql.TIMESTAMP(), nullable=True),
+    sa.Column('updated_at', postgresql.TIMESTAMP(), nullable=True),
+    sa.CheckConstraint('rating BETWEEN 1 AND 5', name='ck_reviews_rating'),
+    sa.ForeignKeyConstraint(['book_uid'], ['books.uid'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_uid'], ['users.uid'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('uid'),
+    sa.UniqueConstraint('book_uid', 'user_uid', name='uq_reviews_book_user')
+    )
+    op.create_index('ix_reviews_book_created_at_uid', 'reviews', ['book_uid', sa.text('created_at DESC'), sa.text('uid DESC')], unique=False)
+    op.create_table('book_ratings',
+    sa.Column('book_uid', sa.Uuid(), nullable=False),
+    sa.Column('review_count', sa.Integer(), nullable=False),
+    sa.Column('rating_sum', sa.Integer(), nullable=False),
+    sa.Column('rating_1', sa.Integer(), nullable=False),
+    sa.Column('rating_2', sa.Integer(), nullable=False),
+    sa.Column('rating_3', sa.Integer(), nullable=False),
+    sa.Column('rating_4', sa.Integer(), nullable=False),
+    sa.Column('rating_5', sa.Integer(), nullable=False),
+    sa.Column('average_rating', sa.Float(), nullable=True),
+    sa.Column('weighted_rating', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['book_uid'], ['books.uid'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('book_uid')
+    )
+    op.create_index('ix_book_ratings_weighted_rating', 'book_ratings', [sa.text('weighted_rating DESC'), sa.text('book_uid DESC')], unique=False, postgresql_where=sa.text('review_count > 0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_book_ratings_weighted_rating', table_name='book_ratings', postgresql_where=sa.text('review_count > 0'))
+    op.drop_table('book_ratings')
+    op.drop_index('ix_reviews_book_created_at_uid', table_name='reviews')
+    op.drop_table('reviews')
@@ -0,0 +1,90 @@
+import math
+import time
+from typing import Iterable, Protocol
+
+from redis.asyncio import Redis
+from src.config import Config
+from src.redis import REVOKED_JTI_CHANNEL, redis_client
+
+
+class TokenBlocklist(Protocol):
+    async def revoke(self, jti: str, expires_at: float) -> None: ...
+
+    async def is_revoked(self, jti: str) -> bool: ...
+
+    async def revoked(self, jtis: Iterable[str]) -> set[str]: ...
+
+
+class RedisTokenBlocklist:
+    '''Revoked jtis as Redis keys that expire together with their token.
+
+    Keys are the bare jti, as written by earlier releases, so tokens
+    revoked before an upgrade stay revoked.
+    '''
+
+    def __init__(self, client: Redis) -> None:
+        self.client = client
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        ttl = math.ceil(expires_at - time.time())
+        if ttl <= 0:
+            return
+
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(jti, b'1', ex=ttl)
+            pipe.publish(REVOKED_JTI_CHANNEL, jti)
+            await pipe.execute()
+
+    async def is_revoked(self, jti: str) -> bool:
+        return bool(await self.client.exists(jti))
+
+    async def revoked(self, jtis: Iterable[str]) -> set[str]:
+        '''The revoked subset of jtis, checked with a single MGET'''
+        jtis = list(jtis)
+        if not jtis:
+            return set()
+
+        values = await self.client.mget(jtis)
+        return {jti for jti, value in zip(jtis, values) if value is not None}
+
+
+class MemoryTokenBlocklist:
+    '''Process-local blocklist for tests and single-process development (TOKEN_BLOCKLIST_BACKEND=memory).
+
+    Revocations are not shared with other workers.
+    '''
+
+    def __init__(self) -> None:
+        self._revoked: dict[str, float] = {}
+        self._purge_at = 1024
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        if expires_at <= time.time():
+            return
+
+        self._revoked[jti] = expires_at
+        if len(self._revoked) >= self._purge_at:
+            self._purge()
+
+    async def is_revoked(self, jti: str) -> bool:
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    async def revoked(self, jtis: Iterable[str]) -> set[str]:
+        now = time.time()
+        return {jti for jti in jtis if self._revoked.get(jti, 0) > now}
+
+    def _purge(self) -> None:
+        now = time.time()
+        self._revoked = {jti: expires_at for jti, expires_at in self._revoked.items() if expires_at > now}
+        # Amortised: the next sweep waits until the live set has doubled.
+        self._purge_at = max(1024, 2 * len(self._revoked))
+
+
+def create_token_blocklist(backend: str) -> TokenBlocklist:
+    if backend == 'memory':
+        return MemoryTokenBlocklist()
+    return RedisTokenBlocklist(redis_client)
+
+
+token_blocklist = create_token_blocklist(Config.TOKEN_BLOCKLIST_BACKEND)
@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import time
+
+from redis.exceptions import RedisError
+from src.auth.schemas import CurrentUserModel
+from src.cache import TTLCache, register_invalidation
+from src.config import Config
+from src.redis import (
+    REVOKED_JTI_CHANNEL,
+    SESSION_ENDED_CHANNEL,
+    USER_EPOCH_CHANNEL,
+    USER_INVALIDATION_CHANNEL,
+    redis_client,
+)
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_PREFIX = 'user:'
+
+
+class TokenCache:
+    '''Per-process cache of verified token payloads and recent revocations.
+
+    Cached payloads are only served while the invalidation listener is
+    subscribed, otherwise a logout in another worker could be missed. If
+    a revocation or epoch has to be evicted while still live, every cached
+    payload is dropped, so none can outlive the record that blocks it.
+    '''
+
+    def __init__(self, maxsize: int, ttl: int) -> None:
+        self.ttl = ttl
+        self.listening = False
+        self._tokens: TTLCache[dict] = TTLCache(maxsize)
+        self._revoked: TTLCache[bool] = TTLCache(maxsize)
+        self._epochs: TTLCache[int] = TTLCache(maxsize)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        if not self.listening:
+            return None
+
+        token_data = self._tokens.get(self._key(token))
+        if token_data is None:
+            return None
+
+        if self.is_revoked(token_data):
+            self._tokens.pop(self._key(token))
+            return None
+
+        return token_data
+
+    def set(self, token: str, token_data: dict) -> None:
+        if not self.listening:
+            return
+
+        expires_at = min(token_data['exp'], time.time() + self.ttl)
+        self._tokens.set(self._key(token), token_data, expires_at)
+
+    def revoke(self, jti_or_session_id: str) -> None:
+        # Cached payloads live at most ttl seconds, so neither need this longer.
+        if self._revoked.set(jti_or_session_id, True, time.time() + self.ttl):
+            self._tokens.clear()
+
+    def set_epoch(self, user_uid: str, epoch: int) -> None:
+        if self._epochs.set(user_uid, epoch, time.time() + self.ttl):
+            self._tokens.clear()
+
+    def on_epoch_message(self, message: str) -> None:
+        user_uid, epoch = message.rsplit(':', 1)
+        self.set_epoch(user_uid, int(epoch))
+
+    def is_revoked(self, token_data: dict) -> bool:
+        if token_data['jit'] in self._revoked or token_data.get('sid') in self._revoked:
+            return True
+
+        epoch = self._epochs.get(token_data['user']['user_uid'])
+        return epoch is not None and token_data.get('epoch', 0) < epoch
+
+    def clear(self) -> None:
+        self._tokens.clear()
+
+
+class UserCache:
+    '''Read-through cache of current-user snapshots keyed by user uid.
+
+    A local LRU sits in front of an optional Redis tier shared by all
+    workers. Local entries are only served while the invalidation
+    listener is subscribed.
+    '''
+
+    def __init__(self, maxsize: int, ttl: int, use_redis: bool) -> None:
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self.listening = False
+        self._users: TTLCache[CurrentUserModel] = TTLCache(maxsize)
+
+    async def get(self, user_uid: str) -> CurrentUserModel | None:
+        if self.listening:
+            user = self._users.get(user_uid)
+            if user is not None:
+                return user
+
+        if not self.use_redis:
+            return None
+
+        try:
+            raw = await redis_client.get(USER_CACHE_PREFIX + user_uid)
+        except RedisError as ex:
+            logger.warning('User cache read failed: %s', ex)
+            return None
+
+        if raw is None:
+            return None
+
+        user = CurrentUserModel.model_validate_json(raw)
+        self._remember(user_uid, user)
+        return user
+
+    async def set(self, user_uid: str, user: CurrentUserModel) -> None:
+        self._remember(user_uid, user)
+        if not self.use_redis:
+            return
+
+        try:
+            await redis_client.set(USER_CACHE_PREFIX + user_uid, user.model_dump_json(), ex=self.ttl)
+        except RedisError as ex:
+            logger.warning('User cache write failed: %s', ex)
+
+    async def invalidate(self, user_uid: str) -> None:
+        self.discard(user_uid)
+        try:
+            if self.use_redis:
+                await redis_client.delete(USER_CACHE_PREFIX + user_uid)
+            await redis_client.publish(USER_INVALIDATION_CHANNEL, user_uid)
+        except RedisError as ex:
+            logger.warning('User cache invalidation failed: %s', ex)
+
+    def discard(self, user_uid: str) -> None:
+        self._users.pop(user_uid)
+
+    def clear(self) -> None:
+        self._users.clear()
+
+    def _remember(self, user_uid: str, user: CurrentUserModel) -> None:
+        if self.listening:
+            self._users.set(user_uid, user, time.time() + self.ttl)
+
+
+token_cache = TokenCache(maxsize=Config.TOKEN_CACHE_SIZE, ttl=Config.TOKEN_CACHE_TTL)
+user_cache = UserCache(
+    maxsize=Config.USER_CACHE_SIZE,
+    ttl=Config.USER_CACHE_TTL,
+    use_redis=Config.USER_CACHE_REDIS,
+)
+
+
+register_invalidation(REVOKED_JTI_CHANNEL, token_cache.revoke, token_cache)
+register_invalidation(SESSION_ENDED_CHANNEL, token_cache.revoke, token_cache)
+register_invalidation(USER_EPOCH_CHANNEL, token_cache.on_epoch_message, token_cache)
+register_invalidation(USER_INVALIDATION_CHANNEL, user_cache.discard, user_cache)
@@ -1,17 +1,29 @@
-from fastapi import Depends, HTTPException, status, Request
+import uuid
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer
-from sqlmodel.ext.asyncio.session import AsyncSession
-from src.auth.models import User
+
+from src.auth.blocklist import token_blocklist
+from src.auth.cache import token_cache, user_cache
+from src.auth.schemas import CurrentUserModel
 from src.auth.service import UserService
+from src.auth.sessions import session_store
 from src.auth.utils import decode_token
-from src.database import get_session
+from src.database import async_session_maker, open_read_session
 from src.errors import AccessTokenRequired, InvalidToken, RefreshTokenRequired
-from src.redis import is_jit_in_blocklist
-
 
 user_service = UserService()
 
 
+async def is_token_active(token_data: dict) -> bool:
+    session_id = token_data.get('sid')
+    if session_id is None:
+        # Issued before sessions existed; only the jti can have been revoked.
+        return not await token_blocklist.is_revoked(token_data['jit'])
+
+    return await session_store.is_active(session_id, token_data['user']['user_uid'], token_data.get('epoch', 0))
+
+
 class TokenBearer(HTTPBearer):
     def __init__(self, auto_error: bool = True) -> None:
         super().__init__(auto_error=auto_error)
@@ -21,22 +33,21 @@ class TokenBearer(HTTPBearer):
 
         token = creds.credentials
 
-        if not self.is_token_valid(token):
-            raise InvalidToken
+        token_data = token_cache.get(token)
+        if token_data is None:
+            token_data = decode_token(token)
+            if token_data is None:
+                raise InvalidToken
 
-        token_data = decode_token(token)
+            if token_cache.is_revoked(token_data) or not await is_token_active(token_data):
+                raise InvalidToken
 
-        if await is_jit_in_blocklist(token_data['jit']):
-            raise InvalidToken
+            token_cache.set(token, token_data)
 
         self.verify_token_data(token_data)
 
         return token_data
 
-    def is_token_valid(self, token: str) -> bool:
-        token_data = decode_token(token)
-        return token_data is not None
-
     def verify_token_data(self, token_data: dict) -> None:
         raise NotImplementedError('Please override this method to verify token data.')
 
@@ -53,18 +64,33 @@ class RefreshTokenBearer(TokenBearer):
             raise RefreshTokenRequired
 
 
-async def get_current_user(
-    token_data: dict = Depends(AccessTokenBearer()),
-    session: AsyncSession = Depends(get_session)
-) -> User | None:
-    return await user_service.get_user_by_email(token_data['user']['email'], session)
+async def get_current_user(token_data: dict = Depends(AccessTokenBearer())) -> CurrentUserModel | None:
+    user_uid = token_data['user']['user_uid']
+
+    current_user = await user_cache.get(user_uid)
+    if current_user is not None:
+        return current_user
+
+    # Opened only on a cache miss so cached requests never check out a connection.
+    async with await open_read_session() as session:
+        user = await user_service.get_user_by_uid(uuid.UUID(user_uid), session)
+    if user is None:
+        # A replica may not have the account yet if it was just created.
+        async with async_session_maker() as primary:
+            user = await user_service.get_user_by_uid(uuid.UUID(user_uid), primary)
+    if user is None:
+        return None
+
+    current_user = CurrentUserModel.model_validate(user)
+    await user_cache.set(user_uid, current_user)
+    return current_user
 
 
 class RoleChecker:
     def __init__(self, allowed_roles: list[str]) -> None:
         self.allowed_roles = allowed_roles
 
-    async def __call__(self, current_user: User = Depends(get_current_user)) -> bool:
+    async def __call__(self, current_user: CurrentUserModel = Depends(get_current_user)) -> bool:
         if not current_user.is_verified:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
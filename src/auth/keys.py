@@ -0,0 +1,123 @@
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.serialization import (
+    load_pem_private_key,
+    load_pem_public_key,
+)
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+PublicKey = ed25519.Ed25519PublicKey | ec.EllipticCurvePublicKey
+PrivateKey = ed25519.Ed25519PrivateKey | ec.EllipticCurvePrivateKey
+
+
+@dataclass(frozen=True)
+class VerifyingKey:
+    kid: str
+    algorithm: str
+    key: PublicKey
+
+    def to_jwk(self) -> dict:
+        algorithm = OKPAlgorithm if self.algorithm == 'EdDSA' else ECAlgorithm
+        jwk = algorithm.to_jwk(self.key, as_dict=True)
+        return {**jwk, 'kid': self.kid, 'alg': self.algorithm, 'use': 'sig'}
+
+
+def _algorithm_for(key: PublicKey) -> str:
+    if isinstance(key, ed25519.Ed25519PublicKey):
+        return 'EdDSA'
+    if isinstance(key, ec.EllipticCurvePublicKey) and isinstance(key.curve, ec.SECP256R1):
+        return 'ES256'
+    raise ValueError(f'Unsupported JWT key type {type(key).__name__}; use Ed25519 or P-256.')
+
+
+class KeySet:
+    '''Signing and verifying keys for access and refresh tokens.
+
+    Keys are parsed once into cryptography objects, so signing and
+    verifying never re-read PEM. Every key in the set verifies; only the
+    active one signs, which lets tokens signed by the previous key keep
+    working until they expire. Tokens without a kid header are verified
+    with the shared JWT_KEY only when no keys are configured, or until
+    legacy_until while clients migrate.
+    '''
+
+    def __init__(
+        self,
+        keys: dict[str, VerifyingKey],
+        signing_kid: str | None,
+        signing_key: PrivateKey | None,
+        legacy_until: datetime | None = None,
+    ) -> None:
+        self.keys = keys
+        self.signing_kid = signing_kid
+        self._signing_key = signing_key
+        self.legacy_until = legacy_until
+        self.jwks = json.dumps({'keys': [key.to_jwk() for key in keys.values()]}).encode()
+
+    @classmethod
+    def load(cls, keys_dir: str | None, active_kid: str | None, legacy_until: datetime | None = None) -> 'KeySet':
+        '''Read <kid>.pem files; private keys may sign, public ones only verify'''
+        if keys_dir is None:
+            return cls({}, None, None)
+
+        keys = {}
+        private_keys = {}
+        for path in sorted(Path(keys_dir).glob('*.pem')):
+            pem = path.read_bytes()
+            if b'PRIVATE KEY' in pem:
+                private_keys[path.stem] = load_pem_private_key(pem, password=None)
+                public_key = private_keys[path.stem].public_key()
+            else:
+                public_key = load_pem_public_key(pem)
+            keys[path.stem] = VerifyingKey(path.stem, _algorithm_for(public_key), public_key)
+
+        if active_kid not in private_keys:
+            raise ValueError(f'No private key {active_kid}.pem in {keys_dir} to sign tokens with.')
+
+        logger.info('Loaded %s JWT keys, signing with %s.', len(keys), active_kid)
+        if legacy_until is not None and legacy_until.tzinfo is None:
+            legacy_until = legacy_until.replace(tzinfo=timezone.utc)
+        return cls(keys, active_kid, private_keys[active_kid], legacy_until)
+
+    def encode(self, payload: dict) -> str:
+        if self.signing_kid is None:
+            return jwt.encode(payload=payload, key=Config.JWT_KEY, algorithm=Config.JWT_ALGORITHM)
+
+        return jwt.encode(
+            payload=payload,
+            key=self._signing_key,
+            algorithm=self.keys[self.signing_kid].algorithm,
+            headers={'kid': self.signing_kid},
+        )
+
+    def decode(self, token: str) -> dict:
+        kid = jwt.get_unverified_header(token).get('kid')
+        if kid is None:
+            if not self.accepts_legacy():
+                raise jwt.InvalidKeyError('Tokens signed with the shared key are no longer accepted')
+            return jwt.decode(jwt=token, key=Config.JWT_KEY, algorithms=[Config.JWT_ALGORITHM])
+
+        key = self.keys.get(kid)
+        if key is None:
+            raise jwt.InvalidKeyError(f'Unknown key id {kid}')
+
+        # Pinning the algorithm to the key rules out algorithm confusion.
+        return jwt.decode(jwt=token, key=key.key, algorithms=[key.algorithm])
+
+    def accepts_legacy(self) -> bool:
+        if self.signing_kid is None:
+            return True
+        return self.legacy_until is not None and datetime.now(timezone.utc) < self.legacy_until
+
+
+key_set = KeySet.load(Config.JWT_KEYS_DIR, Config.JWT_ACTIVE_KID, Config.JWT_LEGACY_ACCEPT_UNTIL)
@@ -2,6 +2,7 @@ import uuid
 from datetime import datetime
 
 import sqlalchemy.dialects.postgresql as pg
+from sqlalchemy import Index, func
 from sqlmodel import Column, Field, SQLModel
 
 
@@ -32,3 +33,6 @@ class User(SQLModel, table=True):
 
     def __repr__(self) -> str:
         return f'<User {self.username}>'
+
+
+Index('ix_users_email_lower', func.lower(User.email), unique=True)
@@ -1,28 +1,58 @@
-from datetime import datetime, timedelta
+import asyncio
+import logging
+import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlmodel.ext.asyncio.session import AsyncSession
-from starlette.responses import JSONResponse
-
-from src.auth.dependencies import AccessTokenBearer, RefreshTokenBearer, RoleChecker, get_current_user
-from src.auth.models import User
-from src.celery_tasks import send_email
-from src.redis import add_jit_to_blocklist
-from src.utils import ResponseModel
-
-from ..database import get_session
-from .schemas import EmailModel, UserCreateModel, UserLoginModel, UserModel
+from starlette.responses import JSONResponse, Response
+
+from src.auth.blocklist import token_blocklist
+from src.auth.cache import token_cache
+from src.auth.dependencies import (
+    AccessTokenBearer,
+    RefreshTokenBearer,
+    RoleChecker,
+    get_current_user,
+)
+from src.auth.keys import key_set
+from src.auth.sessions import SESSION_TTL, Rotation, session_store
+from src.celery_tasks import queue_email
+from src.errors import InvalidToken
+from src.ratelimit import RateLimit, RateLimitRule, rate_limiter
+from src.utils import ResponseModel, narrowed_model, parse_fields
+
+from ..database import async_session_maker, get_read_session, get_session
+from .schemas import (
+    CurrentUserModel,
+    EmailModel,
+    UserCreateModel,
+    UserLoginModel,
+    UserModel,
+)
 from .service import UserService
-from .utils import create_access_token, create_url_safe_token, verify_password, verify_url_safe_token
-
-REFRESH_TOKEN_EXPIRY = 2
+from .utils import create_access_token, password_hasher, verify_url_safe_token
 
 auth_router = APIRouter()
+jwks_router = APIRouter()
 user_service = UserService()
 role_checker = RoleChecker(allowed_roles=['admin', 'user'])
 
+logger = logging.getLogger(__name__)
+
+# Sign-in is limited per IP and, against credential stuffing spread over
+# many IPs, per account.
+SIGNIN_PER_IP = RateLimitRule('signin:ip', limit=20, window=60)
+SIGNIN_PER_EMAIL = RateLimitRule('signin:email', limit=5, window=300)
+SIGNUP_PER_IP = RateLimitRule('signup:ip', limit=10, window=3600)
+SEND_MAIL_PER_IP = RateLimitRule('send_mail:ip', limit=5, window=60)
 
-@auth_router.post('/signup', status_code=status.HTTP_201_CREATED, response_model=ResponseModel)
+
+@auth_router.post(
+    '/signup',
+    status_code=status.HTTP_201_CREATED,
+    response_model=ResponseModel,
+    dependencies=[Depends(RateLimit(SIGNUP_PER_IP))],
+)
 async def create_user(user_data: UserCreateModel, session: AsyncSession=Depends(get_session)) -> dict:
     try:
         new_user = await user_service.create_user(user_data, session)
@@ -30,15 +60,6 @@ async def create_user(user_data: UserCreateModel, session: AsyncSession=Depends(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail='User with this email already exists.')
 
-    token = create_url_safe_token(data={'email': new_user.email})
-
-    html =f'''
-    <h1>Welcome to our app!</h1>
-    <p>Please verify your email by clicking the link below:</p>
-    <a href="http://localhost:8000/api/v1/auth/verify_email?token={token}">Verify Email</a>
-    '''
-
-    send_email.delay([new_user.email], 'Verify Email', html)
     return {
         'message': 'User created successfully! Please verify your email.',
         'data': {
@@ -64,24 +85,35 @@ async def verify_email(token: str, session: AsyncSession = Depends(get_session))
     }
 
 
-@auth_router.post('/signin')
-async def login_user(login_data: UserLoginModel, session: AsyncSession=Depends(get_session)) -> JSONResponse:
+@auth_router.post('/signin', dependencies=[Depends(RateLimit(SIGNIN_PER_IP))])
+async def login_user(
+    login_data: UserLoginModel, request: Request, session: AsyncSession=Depends(get_read_session)
+) -> JSONResponse:
     email = login_data.email
     password = login_data.password
+    # Checked before the password hash so throttled attempts cost nothing.
+    await rate_limiter.enforce(SIGNIN_PER_EMAIL, email.lower(), request)
 
     user = await user_service.get_user_by_email(email, session)
-    print(f"After query get_user_by_email - Session in transaction: {session.in_transaction()}")
-    if not (user and verify_password(password, user.password_hash)):
+    if user is None:
+        # Sign-up may not have reached the replica yet.
+        async with async_session_maker() as primary:
+            user = await user_service.get_user_by_email(email, primary)
+    if not (user and await password_hasher.verify(password, user.password_hash)):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Incorrect email or password.')
 
-    access_token = create_access_token(
-        user_data={'email': user.email, 'user_uid': str(user.uid)},
-    )
+    user_data = {'email': user.email, 'user_uid': str(user.uid)}
+    refresh_jti = str(uuid.uuid4())
+    session_id, epoch = await session_store.create(str(user.uid), refresh_jti)
 
+    access_token = create_access_token(user_data=user_data, session_id=session_id, epoch=epoch)
     refresh_token = create_access_token(
-        user_data={'email': user.email, 'user_uid': str(user.uid)},
+        user_data=user_data,
         refresh=True,
-        expiry=timedelta(days=REFRESH_TOKEN_EXPIRY),
+        expiry=SESSION_TTL,
+        session_id=session_id,
+        epoch=epoch,
+        jti=refresh_jti,
     )
 
     return JSONResponse(
@@ -98,26 +130,50 @@ async def login_user(login_data: UserLoginModel, session: AsyncSession=Depends(g
 async def get_new_access_token(
     token_data: dict = Depends(RefreshTokenBearer()),
 ) -> JSONResponse:
-    expiry_timestamp = token_data['exp']
-
-    if datetime.fromtimestamp(expiry_timestamp) < datetime.now():
-        new_access_token = create_access_token(user_data=token_data['user'])
-        return JSONResponse(
-            content={
-                'message': 'New access token created.',
-                'access_token': new_access_token,
-            }
-        )
-
-    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                        detail='Invalid or expired token.')
+    # Expiry was already enforced when the token was decoded.
+    session_id = token_data.get('sid')
+    if session_id is None:
+        raise InvalidToken
+
+    refresh_jti = str(uuid.uuid4())
+    rotation = await session_store.rotate(session_id, token_data['jit'], refresh_jti)
+    if rotation is Rotation.REUSED:
+        token_cache.revoke(session_id)
+        logger.warning('Refresh token reused, ended session %s.', session_id)
+    if rotation is not Rotation.ROTATED:
+        raise InvalidToken
+
+    epoch = token_data['epoch']
+    new_access_token = create_access_token(user_data=token_data['user'], session_id=session_id, epoch=epoch)
+    new_refresh_token = create_access_token(
+        user_data=token_data['user'],
+        refresh=True,
+        expiry=SESSION_TTL,
+        session_id=session_id,
+        epoch=epoch,
+        jti=refresh_jti,
+    )
+    return JSONResponse(
+        content={
+            'message': 'New access token created.',
+            'access_token': new_access_token,
+            'refresh_token': new_refresh_token,
+        }
+    )
 
 
 @auth_router.get('/logout')
 async def revoke_token(
     token_data: dict = Depends(AccessTokenBearer())
 ) -> JSONResponse:
-    await add_jit_to_blocklist(token_data['jit'])
+    session_id = token_data.get('sid')
+    if session_id is not None:
+        await session_store.end(session_id)
+        token_cache.revoke(session_id)
+    else:
+        await token_blocklist.revoke(token_data['jit'], token_data['exp'])
+        token_cache.revoke(token_data['jit'])
+
     return JSONResponse(
         status_code=status.HTTP_200_OK,
         content={
@@ -126,17 +182,48 @@ async def revoke_token(
     )
 
 
-@auth_router.get('/me', dependencies=[Depends(role_checker)])
+@auth_router.post('/logout_all')
+async def revoke_all_sessions(
+    token_data: dict = Depends(AccessTokenBearer())
+) -> JSONResponse:
+    user_uid = token_data['user']['user_uid']
+    epoch = await session_store.revoke_all(user_uid)
+    token_cache.set_epoch(user_uid, epoch)
+
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={
+            'message': 'You are now logged out of all sessions!',
+        }
+    )
+
+
+@auth_router.get('/me', response_model=UserModel, dependencies=[Depends(role_checker)])
 async def get_current_user(
-    current_user: User = Depends(get_current_user)
-) -> UserModel:
-    return current_user
+    fields: str | None = Query(None, description='Comma-separated user fields to return; uid is always included'),
+    current_user: CurrentUserModel = Depends(get_current_user),
+) -> UserModel | Response:
+    selected = parse_fields(fields, UserModel)
+    if selected is None:
+        return current_user
 
+    # Served from the user cache, so only the response is narrowed.
+    body = narrowed_model(UserModel, selected).model_validate(current_user, from_attributes=True).model_dump_json()
+    return Response(content=body, media_type='application/json')
 
-@auth_router.post('/send_mail')
+
+@auth_router.post('/send_mail', dependencies=[Depends(RateLimit(SEND_MAIL_PER_IP))])
 async def send_mail(emails: EmailModel) -> JSONResponse:
-    body = '<h1>Welcome to our app!</h1>'
+    await asyncio.to_thread(queue_email, emails.addresses, 'Test Email', 'welcome.html', {})
+
+    return {'message': 'Email sent successfully!'}
 
-    send_email.delay(emails.addresses, 'Test Email', body)
 
-    return {'message': 'Email sent successfully!'}
\ No newline at end of file
+@jwks_router.get('/.well-known/jwks.json', tags=['auth'])
+async def get_jwks() -> Response:
+    # Downstream services verify tokens locally with these public keys.
+    return Response(
+        content=key_set.jwks,
+        media_type='application/json',
+        headers={'Cache-Control': 'public, max-age=300'},
+    )
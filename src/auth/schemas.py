@@ -11,13 +11,18 @@ class UserModel(BaseModel):
     first_name: str
     last_name: str
     is_verified: bool
-    password_hash: str = Field(exclude=True)
     created_at: datetime
     updated_at: datetime
 
     model_config = {'from_attributes': True}
 
 
+class CurrentUserModel(UserModel):
+    role: str
+
+    model_config = {'from_attributes': True, 'frozen': True}
+
+
 class UserCreateModel(BaseModel):
     first_name: str = Field(max_length=25)
     last_name: str = Field(max_length=25)
@@ -31,5 +36,8 @@ class UserLoginModel(BaseModel):
     password: str = Field(min_length=6)
 
 
+MAX_EMAIL_ADDRESSES = 10
+
+
 class EmailModel(BaseModel):
-    addresses: list[str]
+    addresses: list[str] = Field(min_length=1, max_length=MAX_EMAIL_ADDRESSES)
@@ -1,9 +1,14 @@
-from sqlmodel import select
+import uuid
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import func, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.auth.cache import user_cache
 from src.auth.models import User
 from src.auth.schemas import UserCreateModel
-from src.auth.utils import generate_password_hash
+from src.auth.utils import create_url_safe_token, password_hasher
+from src.outbox.service import add_email
 
 
 class UserAlreadyExists(Exception):
@@ -19,26 +24,44 @@ class UserService:
     UserNotFound = UserNotFound
 
     async def get_user_by_email(self, email: str, session: AsyncSession) -> User | None:
-        print(f"Before query - Session in transaction: {session.in_transaction()}")
-        statement = select(User).where(User.email == email)
+        statement = select(User).where(func.lower(User.email) == email.lower())
         result = await session.exec(statement)
         user = result.first()
-        print(f"After query - Session in transaction: {session.in_transaction()}")
         return user
 
+    async def get_user_by_uid(self, user_uid: uuid.UUID, session: AsyncSession) -> User | None:
+        return await session.get(User, user_uid)
+
     async def user_exists(self, email: str, session: AsyncSession) -> bool:
         user = await self.get_user_by_email(email, session)
         return user is not None
 
     async def create_user(self, user_data: UserCreateModel, session: AsyncSession) -> User:
-        async with session.begin():
-            if await self.user_exists(user_data.email, session):
-                raise UserAlreadyExists
+        # Duplicates are turned away before spending bcrypt on them; the check
+        # is repeated in the transaction for signups racing this one.
+        if await self.user_exists(user_data.email, session):
+            raise UserAlreadyExists
+        # Hash with no transaction open so bcrypt never holds a pooled connection.
+        await session.rollback()
+        password_hash = await password_hasher.hash(user_data.password)
+
+        try:
+            async with session.begin():
+                if await self.user_exists(user_data.email, session):
+                    raise UserAlreadyExists
+
+                user_data_dict = user_data.model_dump()
+                new_user = User(**user_data_dict)
+                new_user.password_hash = password_hash
+                session.add(new_user)
 
-            user_data_dict = user_data.model_dump()
-            new_user = User(**user_data_dict)
-            new_user.password_hash = generate_password_hash(user_data_dict['password'])
-            session.add(new_user)
+                # Committed with the user, so the email is neither lost nor sent for a rolled-back signup.
+                token = create_url_safe_token(data={'email': new_user.email})
+                add_email(session, [new_user.email], 'Verify Email', 'verify_email.html', {'token': token})
+        except IntegrityError as ex:
+            # A concurrent signup committed the same email between the check and the commit.
+            await session.rollback()
+            raise UserAlreadyExists from ex
         return new_user
 
     async def update_user(self, user_email: str, user_data: dict, session: AsyncSession) -> User:
@@ -50,5 +73,6 @@ class UserService:
             for k, v in user_data.items():
                 setattr(user, k, v)
 
+        await user_cache.invalidate(str(user.uid))
         return user
 
@@ -0,0 +1,147 @@
+import enum
+import time
+import uuid
+from datetime import timedelta
+from typing import Protocol
+
+from redis.asyncio import Redis
+from src.config import Config
+from src.redis import SESSION_ENDED_CHANNEL, USER_EPOCH_CHANNEL, redis_client
+
+SESSION_TTL = timedelta(days=2)
+SESSION_PREFIX = 'session:'
+USER_EPOCH_PREFIX = 'user_epoch:'
+
+# Swaps the family's current refresh jti only if the presented one is
+# current; a stale one means the token was replayed, so the family ends.
+ROTATE_SCRIPT = '''
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 0
+end
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return -1
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+'''
+
+
+class Rotation(enum.IntEnum):
+    REUSED = -1
+    MISSING = 0
+    ROTATED = 1
+
+
+class SessionStore(Protocol):
+    async def create(self, user_uid: str, refresh_jti: str) -> tuple[str, int]: ...
+
+    async def rotate(self, session_id: str, presented_jti: str, new_jti: str) -> Rotation: ...
+
+    async def end(self, session_id: str) -> None: ...
+
+    async def revoke_all(self, user_uid: str) -> int: ...
+
+    async def is_active(self, session_id: str, user_uid: str, epoch: int) -> bool: ...
+
+
+class RedisSessionStore:
+    '''Login sessions as refresh-token families, plus a revocation epoch per user.
+
+    Each login stores its current refresh jti under session:{sid}. Tokens
+    carry the sid and the user's epoch at login, so ending one session is
+    one DEL and ending all of a user's sessions is one INCR; checking a
+    token is a single MGET of both keys.
+    '''
+
+    def __init__(self, client: Redis, ttl: timedelta) -> None:
+        self.client = client
+        self.ttl = int(ttl.total_seconds())
+        self._rotate = client.register_script(ROTATE_SCRIPT)
+
+    async def create(self, user_uid: str, refresh_jti: str) -> tuple[str, int]:
+        session_id = str(uuid.uuid4())
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(SESSION_PREFIX + session_id, refresh_jti, ex=self.ttl)
+            pipe.get(USER_EPOCH_PREFIX + user_uid)
+            _, epoch = await pipe.execute()
+        return session_id, int(epoch or 0)
+
+    async def rotate(self, session_id: str, presented_jti: str, new_jti: str) -> Rotation:
+        result = Rotation(await self._rotate(
+            keys=[SESSION_PREFIX + session_id], args=[presented_jti, new_jti, self.ttl]
+        ))
+        if result is Rotation.REUSED:
+            await self.client.publish(SESSION_ENDED_CHANNEL, session_id)
+        return result
+
+    async def end(self, session_id: str) -> None:
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.delete(SESSION_PREFIX + session_id)
+            pipe.publish(SESSION_ENDED_CHANNEL, session_id)
+            await pipe.execute()
+
+    async def revoke_all(self, user_uid: str) -> int:
+        # Never expires: restarting the counter would revive tokens that
+        # carry a higher epoch from before.
+        epoch = await self.client.incr(USER_EPOCH_PREFIX + user_uid)
+        await self.client.publish(USER_EPOCH_CHANNEL, f'{user_uid}:{epoch}')
+        return epoch
+
+    async def is_active(self, session_id: str, user_uid: str, epoch: int) -> bool:
+        session, current_epoch = await self.client.mget(
+            SESSION_PREFIX + session_id, USER_EPOCH_PREFIX + user_uid
+        )
+        return session is not None and epoch >= int(current_epoch or 0)
+
+
+class MemorySessionStore:
+    '''Process-local session store for tests and single-process development'''
+
+    def __init__(self, ttl: timedelta) -> None:
+        self.ttl = ttl.total_seconds()
+        self._sessions: dict[str, tuple[str, float]] = {}
+        self._epochs: dict[str, int] = {}
+
+    async def create(self, user_uid: str, refresh_jti: str) -> tuple[str, int]:
+        session_id = str(uuid.uuid4())
+        self._sessions[session_id] = (refresh_jti, time.time() + self.ttl)
+        return session_id, self._epochs.get(user_uid, 0)
+
+    async def rotate(self, session_id: str, presented_jti: str, new_jti: str) -> Rotation:
+        current = self._current(session_id)
+        if current is None:
+            return Rotation.MISSING
+        if current != presented_jti:
+            self._sessions.pop(session_id, None)
+            return Rotation.REUSED
+
+        self._sessions[session_id] = (new_jti, time.time() + self.ttl)
+        return Rotation.ROTATED
+
+    async def end(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    async def revoke_all(self, user_uid: str) -> int:
+        self._epochs[user_uid] = self._epochs.get(user_uid, 0) + 1
+        return self._epochs[user_uid]
+
+    async def is_active(self, session_id: str, user_uid: str, epoch: int) -> bool:
+        return self._current(session_id) is not None and epoch >= self._epochs.get(user_uid, 0)
+
+    def _current(self, session_id: str) -> str | None:
+        refresh_jti, expires_at = self._sessions.get(session_id, (None, 0))
+        if expires_at <= time.time():
+            self._sessions.pop(session_id, None)
+            return None
+        return refresh_jti
+
+
+def create_session_store(backend: str) -> SessionStore:
+    if backend == 'memory':
+        return MemorySessionStore(SESSION_TTL)
+    return RedisSessionStore(redis_client, SESSION_TTL)
+
+
+session_store = create_session_store(Config.SESSION_STORE_BACKEND)
@@ -1,12 +1,19 @@
+import asyncio
 import logging
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Callable, TypeVar
 
-from itsdangerous import URLSafeTimedSerializer
 import jwt
+from itsdangerous import URLSafeTimedSerializer
 from passlib.context import CryptContext
 
+from src.auth.keys import key_set
 from src.config import Config
+from src.errors import PasswordHasherBusy
+
+T = TypeVar('T')
 
 passwd_context = CryptContext(
     schemes=['bcrypt'],
@@ -21,30 +28,70 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return passwd_context.verify(plain_password, hashed_password)
 
 
-def create_access_token(user_data: dict, expiry: timedelta=None, refresh: bool=False) -> str:
+class PasswordHasher:
+    '''Runs bcrypt on a bounded thread pool so it never blocks the event loop.
+
+    bcrypt releases the GIL, so the threads hash in parallel. Once
+    max_pending calls are queued or running, new calls fail fast with
+    PasswordHasherBusy instead of piling up behind the pool.
+    '''
+
+    def __init__(self, max_workers: int, max_pending: int) -> None:
+        self.max_pending = max_pending
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bcrypt')
+
+    async def hash(self, password: str) -> str:
+        return await self._run(generate_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def _run(self, func: Callable[..., T], *args: str) -> T:
+        if self._pending >= self.max_pending:
+            raise PasswordHasherBusy
+
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        future = self._executor.submit(func, *args)
+        # Released when the thread is done rather than when the caller stops
+        # waiting: a disconnected client's hash still occupies a worker.
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return await asyncio.wrap_future(future)
+
+    def _release(self) -> None:
+        self._pending -= 1
+
+
+password_hasher = PasswordHasher(
+    max_workers=Config.PASSWORD_HASH_WORKERS,
+    max_pending=Config.PASSWORD_HASH_MAX_PENDING,
+)
+
+
+def create_access_token(
+    user_data: dict,
+    expiry: timedelta=None,
+    refresh: bool=False,
+    session_id: str | None = None,
+    epoch: int = 0,
+    jti: str | None = None,
+) -> str:
     payload = {
         'user': user_data,
         'exp': datetime.utcnow() + (expiry if expiry is not None else timedelta(minutes=60)),
-        'jit': str(uuid.uuid4()),
-        'refresh': refresh
+        'jit': jti or str(uuid.uuid4()),
+        'refresh': refresh,
+        'sid': session_id,
+        'epoch': epoch,
     }
 
-    token = jwt.encode(
-        payload=payload,
-        key=Config.JWT_KEY,
-        algorithm=Config.JWT_ALGORITHM
-    )
-
-    return token
+    return key_set.encode(payload)
 
 
 def decode_token(token: str) -> dict|None:
     try:
-        token_data = jwt.decode(
-            jwt=token,
-            key=Config.JWT_KEY,
-            algorithms=[Config.JWT_ALGORITHM],
-        )
+        token_data = key_set.decode(token)
     except jwt.PyJWTError as jwt_ex:
         logging.exception(jwt_ex)
         return None
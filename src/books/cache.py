@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field
+
+from redis.exceptions import RedisError
+from src.cache import TTLCache, register_invalidation
+from src.compression import Codec
+from src.config import Config
+from src.redis import CATALOG_GENERATION_CHANNEL, redis_client
+
+logger = logging.getLogger(__name__)
+
+CATALOG_GENERATION_KEY = 'books:catalog_generation'
+RESPONSE_CACHE_PREFIX = 'books:response:'
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    encoded_bodies: dict[str, bytes] = field(default_factory=dict, compare=False)
+
+    @classmethod
+    def from_body(cls, body: bytes) -> 'CachedResponse':
+        return cls(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+    def matches(self, if_none_match: str | None) -> bool:
+        if not if_none_match:
+            return False
+
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in tags or self.etag in tags
+
+    async def encoded(self, codec: Codec) -> bytes:
+        '''Body compressed with codec, done once per entry at the codec's cached level'''
+        body = self.encoded_bodies.get(codec.name)
+        if body is None:
+            body = await asyncio.to_thread(codec.compress, self.body, codec.cached_level)
+            self.encoded_bodies[codec.name] = body
+        return body
+
+
+class CatalogResponseCache:
+    '''Serialized book-list responses, versioned by a catalog generation.
+
+    Every write bumps the generation in Redis, which makes all older
+    entries unreachable at once. The local tier knows the current
+    generation from pub/sub while the invalidation listener is up and
+    asks Redis for it otherwise.
+    '''
+
+    def __init__(self, maxsize: int, ttl: int) -> None:
+        self.ttl = ttl
+        self.listening = False
+        self.generation: int | None = None
+        self._responses: TTLCache[CachedResponse] = TTLCache(maxsize)
+
+    async def get(self, params: str) -> tuple[int | None, CachedResponse | None]:
+        try:
+            generation = await self._current_generation()
+            key = f'{generation}:{params}'
+
+            response = self._responses.get(key)
+            if response is None:
+                body = await redis_client.get(RESPONSE_CACHE_PREFIX + key)
+                if body is not None:
+                    response = CachedResponse.from_body(body)
+                    self._responses.set(key, response, time.time() + self.ttl)
+        except RedisError as ex:
+            logger.warning('Book response cache read failed: %s', ex)
+            return None, None
+
+        return generation, response
+
+    async def set(self, generation: int | None, params: str, body: bytes) -> CachedResponse:
+        response = CachedResponse.from_body(body)
+        if generation is None:
+            return response
+
+        key = f'{generation}:{params}'
+        self._responses.set(key, response, time.time() + self.ttl)
+        try:
+            await redis_client.set(RESPONSE_CACHE_PREFIX + key, body, ex=self.ttl)
+        except RedisError as ex:
+            logger.warning('Book response cache write failed: %s', ex)
+        return response
+
+    async def bump(self) -> None:
+        try:
+            generation = await redis_client.incr(CATALOG_GENERATION_KEY)
+            await redis_client.publish(CATALOG_GENERATION_CHANNEL, generation)
+        except RedisError as ex:
+            logger.warning('Bumping the catalog generation failed: %s', ex)
+            self.clear()
+            return
+
+        self.on_generation(str(generation))
+
+    def on_generation(self, generation: str) -> None:
+        if self.generation is None or int(generation) > self.generation:
+            self.generation = int(generation)
+            self._responses.clear()
+
+    def clear(self) -> None:
+        self.generation = None
+        self._responses.clear()
+
+    async def _current_generation(self) -> int:
+        if self.listening and self.generation is not None:
+            return self.generation
+
+        generation = int(await redis_client.get(CATALOG_GENERATION_KEY) or 0)
+        if self.listening:
+            self.generation = generation
+        return generation
+
+
+book_cache = CatalogResponseCache(maxsize=Config.BOOK_CACHE_SIZE, ttl=Config.BOOK_CACHE_TTL)
+
+register_invalidation(CATALOG_GENERATION_CHANNEL, book_cache.on_generation, book_cache)
@@ -1,7 +1,19 @@
 import uuid
 from datetime import date, datetime
+from typing import List, Optional
 
-from sqlmodel import TIMESTAMP, Column, Field, SQLModel
+from sqlalchemy import Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlmodel import TIMESTAMP, Column, Field, Relationship, SQLModel
+
+from src.auth.models import User
+from src.reviews.models import BookRating, Review
+
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(publisher, '')), 'C')"
+)
 
 
 class Book(SQLModel, table=True):
@@ -17,8 +29,38 @@ class Book(SQLModel, table=True):
     published_date: date
     page_count: int
     language: str
+    # Bumped by every update; clients send it back in If-Match.
+    version: int = Field(default=1, sa_column_kwargs={'server_default': '1'})
+    user_uid: uuid.UUID | None = Field(default=None, foreign_key='users.uid', ondelete='SET NULL', index=True)
     created_at: datetime = Field(sa_column=Column(TIMESTAMP, default=datetime.utcnow))
     updated_at: datetime = Field(sa_column=Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow))
 
+    # lazy='raise' turns an accidental per-row load into an error instead of
+    # an N+1; callers load them through BookService.include_options
+    # and BookService.attach_reviews.
+    user: Optional[User] = Relationship(sa_relationship_kwargs={'lazy': 'raise'})
+    rating: Optional[BookRating] = Relationship(sa_relationship_kwargs={'lazy': 'raise', 'viewonly': True})
+    reviews: List[Review] = Relationship(
+        back_populates='book',
+        sa_relationship_kwargs={
+            'lazy': 'raise',
+            'order_by': 'desc(Review.created_at)',
+            'passive_deletes': True,
+        },
+    )
+
     def __repr__(self) -> str:
         return f'<Book {self.title}>'
+
+
+# Matches the keyset ordering of BookService.get_books_page.
+Index('ix_books_created_at_uid', Book.created_at.desc(), Book.uid.desc())
+
+# Generated by Postgres and only used in WHERE clauses, so it is added to the
+# table but left unmapped: select(Book) never transfers it.
+Book.__table__.append_column(
+    Column('search_vector', TSVECTOR, Computed(SEARCH_VECTOR_EXPRESSION, persisted=True))
+)
+Index('ix_books_search_vector', Book.__table__.c.search_vector, postgresql_using='gin')
+Index('ix_books_title_trgm', Book.title, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+Index('ix_books_author_trgm', Book.author, postgresql_using='gin', postgresql_ops={'author': 'gin_trgm_ops'})
@@ -1,34 +1,245 @@
 import logging
-import sys
-from typing import List
+import uuid
+from typing import Annotated, AsyncIterator
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Header, HTTPException, Query, Request, status
 from fastapi.params import Depends
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.auth.dependencies import AccessTokenBearer
-from src.books.schemas import BookCreateModel, BookModel
+from src.auth.dependencies import AccessTokenBearer, RoleChecker, get_current_user
+from src.auth.schemas import CurrentUserModel
+from src.books.cache import book_cache
+from src.books.schemas import (
+    BookCreateModel,
+    BookImportReportModel,
+    BookModel,
+    BookPageModel,
+    BookSearchParams,
+    BookSearchResultModel,
+    BookUpdateModel,
+    BookWithRelationsModel,
+    BookWithRelationsPageModel,
+    book_list_adapter,
+)
 from src.books.service import BookService
-from src.database import get_session
+from src.books.utils import (
+    iter_lines,
+    parse_book_rows,
+    parse_if_match,
+    parse_includes,
+    version_etag,
+)
+from src.compression import choose_codec
+from src.database import (
+    async_session_maker,
+    get_read_session,
+    get_session,
+    open_read_session,
+)
+from src.errors import BookNotFound
+from src.utils import narrowed_model, narrowed_page_model, parse_fields
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+STREAM_CHUNK_SIZE = 500
 
 book_router = APIRouter()
 book_service = BookService()
 access_token_bearer = AccessTokenBearer()
+role_checker = RoleChecker(allowed_roles=['admin', 'user'])
 
 
 logger = logging.getLogger(__name__)
 
 
-@book_router.get('/', response_model=List[BookModel], )
+FIELDS_QUERY = Query(None, description='Comma-separated book fields to return; uid is always included')
+
+
+@book_router.get('/', response_model=BookWithRelationsPageModel)
 async def get_all_books(
-    session: AsyncSession=Depends(get_session),
-) -> List[BookModel]:
-    logger.info('List all books.')
-    books = await book_service.get_all_books(session)
-    return books
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    include: str | None = Query(None, description='Comma-separated relations: user, rating, reviews'),
+    fields: str | None = FIELDS_QUERY,
+) -> Response:
+    logger.info('List books page.')
+    includes = parse_includes(include)
+    selected = parse_fields(fields, BookModel)
+    page_model = _page_model(selected, includes)
+    if includes:
+        # Reviews and ratings change without bumping the catalog generation,
+        # so pages with relations are not cached.
+        async with await open_read_session() as session:
+            books, next_cursor = await book_service.get_books_page(session, limit, cursor, includes, selected)
+            page = page_model.model_validate({'items': books, 'next_cursor': next_cursor}, from_attributes=True)
+        return Response(content=page.model_dump_json(), media_type='application/json')
+
+    params = f'limit={limit}&cursor={cursor or ""}&fields={",".join(selected or ())}'
+    generation, cached = await book_cache.get(params)
+
+    if cached is None:
+        # Filled from the primary: a lagging replica's page would be cached
+        # under the new generation and served to every client, writer included.
+        async with async_session_maker() as session:
+            books, next_cursor = await book_service.get_books_page(session, limit, cursor, fields=selected)
+            page = page_model.model_validate({'items': books, 'next_cursor': next_cursor}, from_attributes=True)
+        cached = await book_cache.set(generation, params, page.model_dump_json().encode())
+
+    headers = {'ETag': cached.etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    codec = choose_codec(request.headers.get('accept-encoding'), len(cached.body))
+    if codec is not None:
+        headers['ETag'] = 'W/' + cached.etag
+
+    if cached.matches(request.headers.get('if-none-match')):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if codec is None:
+        return Response(content=cached.body, media_type='application/json', headers=headers)
+
+    # Served precompressed; CompressionMiddleware leaves encoded responses alone.
+    headers['Content-Encoding'] = codec.name
+    return Response(content=await cached.encoded(codec), media_type='application/json', headers=headers)
+
+
+def _page_model(fields: tuple[str, ...] | None, includes: frozenset[str]) -> type[BaseModel]:
+    # Narrowed models only read the attributes they declare, so unloaded
+    # columns and relations are never touched.
+    if not includes:
+        return BookPageModel if fields is None else narrowed_page_model(BookPageModel, narrowed_model(BookModel, fields))
+
+    names = (fields or tuple(BookModel.model_fields)) + tuple(sorted(includes))
+    return narrowed_page_model(BookWithRelationsPageModel, narrowed_model(BookWithRelationsModel, names))
+
+
+@book_router.get('/search', response_model=BookSearchResultModel)
+async def search_books(
+    params: Annotated[BookSearchParams, Query()],
+    session: AsyncSession = Depends(get_read_session),
+) -> Response:
+    selected = parse_fields(params.fields, BookModel)
+    result = await book_service.search_books(params, session, selected)
+    result_model = BookSearchResultModel
+    if selected is not None:
+        result_model = narrowed_page_model(BookSearchResultModel, narrowed_model(BookModel, selected))
+    # Validated and serialized in one pass; returning a Response makes FastAPI
+    # skip validating the same data again against response_model.
+    body = result_model.model_validate(result, from_attributes=True).model_dump_json()
+    return Response(content=body, media_type='application/json')
+
+
+async def _stream_books_ndjson() -> AsyncIterator[bytes]:
+    # The request-scoped session is closed before a streaming body is sent,
+    # so the stream owns its session for as long as rows are being read.
+    async with await open_read_session() as session:
+        chunk = []
+        async for book in book_service.stream_books(session, STREAM_CHUNK_SIZE):
+            chunk.append(book)
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                yield _ndjson(chunk)
+                chunk.clear()
+
+        if chunk:
+            yield _ndjson(chunk)
+
+
+def _ndjson(books: list) -> bytes:
+    items = book_list_adapter.validate_python(books, from_attributes=True)
+    return b''.join(item.model_dump_json().encode() + b'\n' for item in items)
+
+
+@book_router.get('/stream')
+async def stream_all_books() -> StreamingResponse:
+    logger.info('Stream all books.')
+    return StreamingResponse(_stream_books_ndjson(), media_type='application/x-ndjson')
 
 
 @book_router.post('/', status_code=status.HTTP_201_CREATED, response_model=BookModel)
-async def create_book(book_data: BookCreateModel, session: AsyncSession = Depends(get_session)) -> BookModel:
-    new_book = await book_service.create_book(book_data, session)
+async def create_book(
+    book_data: BookCreateModel,
+    token_data: dict = Depends(access_token_bearer),
+    session: AsyncSession = Depends(get_session),
+) -> BookModel:
+    user_uid = uuid.UUID(token_data['user']['user_uid'])
+    new_book = await book_service.create_book(book_data, user_uid, session)
     return new_book
+
+
+@book_router.post('/bulk', response_model=BookImportReportModel)
+async def bulk_import_books(
+    request: Request,
+    token_data: dict = Depends(access_token_bearer),
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    content_type = request.headers.get('content-type', '').split(';')[0].strip()
+    if content_type not in ('text/csv', 'application/x-ndjson'):
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail='Send books as text/csv or application/x-ndjson.')
+
+    rows = parse_book_rows(iter_lines(request.stream()), is_csv=content_type == 'text/csv')
+    user_uid = uuid.UUID(token_data['user']['user_uid'])
+    report = await book_service.import_books(rows, user_uid, session)
+
+    logger.info('Bulk imported %s books, %s rows failed.', report['inserted'], report['failed'])
+    return report
+
+
+@book_router.get('/{book_uid}', response_model=BookModel)
+async def get_book(
+    book_uid: uuid.UUID,
+    response: Response,
+    fields: str | None = FIELDS_QUERY,
+    session: AsyncSession = Depends(get_read_session),
+) -> BookModel | Response:
+    selected = parse_fields(fields, BookModel)
+    book = await book_service.get_book_by_uid(book_uid, session, selected)
+    if book is None:
+        raise BookNotFound
+
+    etag = version_etag(book.version)
+    if selected is None:
+        response.headers['ETag'] = etag
+        return book
+
+    body = narrowed_model(BookModel, selected).model_validate(book, from_attributes=True).model_dump_json()
+    return Response(content=body, media_type='application/json', headers={'ETag': etag})
+
+
+@book_router.patch('/{book_uid}', response_model=BookModel, dependencies=[Depends(role_checker)])
+async def update_book(
+    book_uid: uuid.UUID,
+    update_data: BookUpdateModel,
+    response: Response,
+    if_match: str | None = Header(None),
+    current_user: CurrentUserModel = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+) -> BookModel:
+    book = await book_service.update_book_by_uid(
+        book_uid, update_data, session, parse_if_match(if_match), _owner_filter(current_user)
+    )
+    if book is None:
+        raise BookNotFound
+
+    response.headers['ETag'] = version_etag(book.version)
+    return book
+
+
+@book_router.delete('/{book_uid}', status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(role_checker)])
+async def delete_book(
+    book_uid: uuid.UUID,
+    if_match: str | None = Header(None),
+    current_user: CurrentUserModel = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+) -> None:
+    deleted = await book_service.delete_book_by_uid(
+        book_uid, session, parse_if_match(if_match), _owner_filter(current_user)
+    )
+    if not deleted:
+        raise BookNotFound
+
+
+def _owner_filter(current_user: CurrentUserModel) -> uuid.UUID | None:
+    # Admins may change any book; everyone else only the ones they added.
+    return None if current_user.role == 'admin' else current_user.uid
@@ -1,7 +1,8 @@
 import uuid
-from datetime import date
+from datetime import date, datetime
+from typing import Any, List
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter
 
 
 class BookModel(BaseModel):
@@ -12,6 +13,69 @@ class BookModel(BaseModel):
     published_date: date
     page_count: int
     language: str
+    version: int
+    user_uid: uuid.UUID | None = None
+
+
+class BookOwnerModel(BaseModel):
+    uid: uuid.UUID
+    username: str
+
+
+class BookReviewModel(BaseModel):
+    uid: uuid.UUID
+    user_uid: uuid.UUID
+    rating: int
+    review_text: str
+    created_at: datetime
+
+
+class BookRatingSummaryModel(BaseModel):
+    review_count: int
+    average_rating: float | None
+    histogram: dict[int, int]
+
+
+class BookWithRelationsModel(BookModel):
+    '''A book plus whichever relations were asked for with include='''
+
+    user: BookOwnerModel | None = None
+    rating: BookRatingSummaryModel | None = None
+    reviews: List[BookReviewModel] | None = None
+
+
+# Built once at import: creating a TypeAdapter compiles its validator and serializer.
+book_list_adapter = TypeAdapter(List[BookModel])
+
+
+class BookPageModel(BaseModel):
+    items: List[BookModel]
+    next_cursor: str | None = None
+
+
+class BookWithRelationsPageModel(BaseModel):
+    items: List[BookWithRelationsModel]
+    next_cursor: str | None = None
+
+
+class BookSearchParams(BaseModel):
+    q: str | None = Field(None, max_length=200)
+    language: str | None = None
+    published_from: date | None = None
+    published_to: date | None = None
+    min_pages: int | None = Field(None, ge=0)
+    max_pages: int | None = Field(None, ge=0)
+    limit: int = Field(20, ge=1, le=100)
+    offset: int = Field(0, ge=0, le=10000)
+    fields: str | None = None
+
+
+class BookSearchResultModel(BaseModel):
+    items: List[BookModel]
+    total: int
+    facets: dict[str, dict[str, int]]
+    limit: int
+    offset: int
 
 
 class BookCreateModel(BaseModel):
@@ -23,9 +87,20 @@ class BookCreateModel(BaseModel):
     language: str
 
 
+class BookImportErrorModel(BaseModel):
+    line: int
+    errors: List[dict[str, Any]]
+
+
+class BookImportReportModel(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BookImportErrorModel]
+
+
 class BookUpdateModel(BaseModel):
-    title: str
-    author: str
-    publisher: str
-    page_count: int
-    language: str
+    title: str | None = None
+    author: str | None = None
+    publisher: str | None = None
+    page_count: int | None = None
+    language: str | None = None
@@ -1,53 +1,427 @@
-from typing import List
+import json
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import AsyncIterator, List
 
+from sqlalchemy import (
+    ColumnElement,
+    delete,
+    extract,
+    func,
+    insert,
+    literal,
+    or_,
+    tuple_,
+    update,
+)
+from sqlalchemy.orm import joinedload, load_only
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql.base import ExecutableOption
 from sqlmodel import desc, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.books.cache import book_cache
 from src.books.models import Book
-from src.books.schemas import BookCreateModel, BookUpdateModel
+from src.books.schemas import BookCreateModel, BookSearchParams, BookUpdateModel
+from src.books.utils import decode_cursor, encode_cursor
+from src.database import async_session_maker
+from src.errors import BookNotOwned, BookVersionConflict
+from src.reviews.models import Review
+
+SEARCH_CONFIG = 'simple'
+MAX_FACET_VALUES = 20
+CATALOG_FACETS_CACHE_KEY = 'search:catalog_facets'
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+# include=reviews embeds only the newest reviews of each book; the rest are
+# paged through /reviews/books/{uid}.
+INCLUDED_REVIEWS = 5
+BULK_COLUMNS = (
+    'uid', 'title', 'author', 'publisher', 'published_date',
+    'page_count', 'language', 'user_uid', 'created_at', 'updated_at',
+)
+
+logger = logging.getLogger(__name__)
+
+
+class BookImportReport:
+    def __init__(self) -> None:
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line_no: int, errors: list) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_no, 'errors': errors})
+
+    def to_dict(self) -> dict:
+        return {'inserted': self.inserted, 'failed': self.failed, 'errors': self.errors}
 
 
 class BookService:
-    async def get_all_books(self, session: AsyncSession) -> List[Book]:
-        statement = select(Book).order_by(desc(Book.created_at))
+    def include_options(self, includes: frozenset[str]) -> list[ExecutableOption]:
+        '''Loader options for the to-one relations named in include=.
+
+        They ride along in the page query as LEFT JOINs; reviews are loaded
+        afterwards by attach_reviews.
+        '''
+        options = []
+        if 'user' in includes:
+            options.append(joinedload(Book.user))
+        if 'rating' in includes:
+            options.append(joinedload(Book.rating))
+        return options
+
+    async def attach_reviews(self, books: List[Book], session: AsyncSession) -> None:
+        '''Load the newest INCLUDED_REVIEWS reviews of every book in one query.
+
+        A page therefore costs the same number of queries however many books
+        it holds, and its size stays bounded however many reviews they have.
+        '''
+        if not books:
+            return
+
+        ranked = (
+            select(
+                Review.uid,
+                func.row_number()
+                .over(partition_by=Review.book_uid, order_by=(desc(Review.created_at), desc(Review.uid)))
+                .label('position'),
+            )
+            .where(Review.book_uid.in_([book.uid for book in books]))
+            .subquery()
+        )
+        statement = (
+            select(Review)
+            .join(ranked, ranked.c.uid == Review.uid)
+            .where(ranked.c.position <= INCLUDED_REVIEWS)
+            .order_by(desc(Review.created_at), desc(Review.uid))
+        )
+        reviews_by_book = defaultdict(list)
+        for review in (await session.exec(statement)).all():
+            reviews_by_book[review.book_uid].append(review)
+
+        for book in books:
+            set_committed_value(book, 'reviews', reviews_by_book[book.uid])
+
+    def column_options(self, fields: tuple[str, ...] | None, *required: ColumnElement) -> list[ExecutableOption]:
+        '''Restrict the SELECT to the columns behind fields=, plus any the caller needs itself'''
+        if fields is None:
+            return []
+        return [load_only(*(getattr(Book, name) for name in fields), *required)]
+
+    async def get_books_page(
+        self,
+        session: AsyncSession,
+        limit: int,
+        cursor: str | None = None,
+        includes: frozenset[str] = frozenset(),
+        fields: tuple[str, ...] | None = None,
+    ) -> tuple[List[Book], str | None]:
+        # Fetch one extra row to know whether another page exists.
+        statement = (
+            select(Book)
+            .order_by(desc(Book.created_at), desc(Book.uid))
+            .limit(limit + 1)
+            .options(*self.include_options(includes), *self.column_options(fields, Book.created_at))
+        )
+        if cursor is not None:
+            created_at, uid = decode_cursor(cursor)
+            statement = statement.where(tuple_(Book.created_at, Book.uid) < (created_at, uid))
+
         result = await session.exec(statement)
-        return result.all()
+        books = result.all()
+
+        next_cursor = None
+        if len(books) > limit:
+            books = books[:limit]
+            next_cursor = encode_cursor(books[-1].created_at, books[-1].uid)
+
+        if 'reviews' in includes:
+            await self.attach_reviews(books, session)
+        return books, next_cursor
+
+    async def stream_books(self, session: AsyncSession, chunk_size: int) -> AsyncIterator[Book]:
+        statement = (
+            select(Book)
+            .order_by(desc(Book.created_at), desc(Book.uid))
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await session.stream_scalars(statement)
+        async for book in result:
+            yield book
+
+    async def search_books(
+        self, params: BookSearchParams, session: AsyncSession, fields: tuple[str, ...] | None = None
+    ) -> dict:
+        filters = self._search_filters(params)
+        rank = literal(0.0)
+
+        if params.q:
+            search_vector = Book.__table__.c.search_vector
+            tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, params.q)
+            prefix = params.q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            # Full-text match, title prefix, or trigram similarity for typos;
+            # each branch is served by one of the GIN indexes on books.
+            filters.append(or_(
+                search_vector.op('@@')(tsquery),
+                Book.title.ilike(prefix),
+                Book.title.op('%')(params.q),
+                Book.author.op('%')(params.q),
+            ))
+            rank = func.greatest(
+                func.ts_rank(search_vector, tsquery),
+                func.similarity(Book.title, params.q),
+                func.similarity(Book.author, params.q),
+            )
+
+        statement = (
+            select(Book)
+            .where(*filters)
+            .order_by(rank.desc(), Book.uid)
+            .limit(params.limit)
+            .offset(params.offset)
+            .options(*self.column_options(fields))
+        )
+        books = (await session.exec(statement)).all()
+        if filters:
+            total, facets = await self._search_facets(filters, session)
+        else:
+            total, facets = await self._catalog_facets()
+
+        return {
+            'items': books,
+            'total': total,
+            'facets': facets,
+            'limit': params.limit,
+            'offset': params.offset,
+        }
 
-    async def get_book_by_uid(self, book_uid: str, session: AsyncSession) -> Book | None:
-        statement = select(Book).where(Book.uid == book_uid)
+    async def _search_facets(
+        self, filters: list[ColumnElement[bool]], session: AsyncSession
+    ) -> tuple[int, dict[str, dict[str, int]]]:
+        total = (await session.exec(select(func.count()).select_from(Book).where(*filters))).one()
+        published_year = extract('year', Book.published_date)
+        facets = {
+            'language': await self._facet_counts(Book.language, filters, session),
+            'published_year': await self._facet_counts(published_year, filters, session),
+        }
+        return total, facets
+
+    async def _catalog_facets(self) -> tuple[int, dict[str, dict[str, int]]]:
+        '''Total and facets of the whole catalog, cached until the next catalog write'''
+        generation, cached = await book_cache.get(CATALOG_FACETS_CACHE_KEY)
+        if cached is not None:
+            data = json.loads(cached.body)
+            return data['total'], data['facets']
+
+        # Counted on the primary: a lagging replica's counts would be cached
+        # under the new generation.
+        async with async_session_maker() as session:
+            total, facets = await self._search_facets([], session)
+        body = json.dumps({'total': total, 'facets': facets}).encode()
+        await book_cache.set(generation, CATALOG_FACETS_CACHE_KEY, body)
+        return total, facets
+
+    def _search_filters(self, params: BookSearchParams) -> list[ColumnElement[bool]]:
+        filters = []
+        if params.language is not None:
+            filters.append(Book.language == params.language)
+        if params.published_from is not None:
+            filters.append(Book.published_date >= params.published_from)
+        if params.published_to is not None:
+            filters.append(Book.published_date <= params.published_to)
+        if params.min_pages is not None:
+            filters.append(Book.page_count >= params.min_pages)
+        if params.max_pages is not None:
+            filters.append(Book.page_count <= params.max_pages)
+        return filters
+
+    async def _facet_counts(
+        self, column: ColumnElement, filters: list[ColumnElement[bool]], session: AsyncSession
+    ) -> dict[str, int]:
+        count = func.count()
+        statement = (
+            select(column, count)
+            .select_from(Book)
+            .where(*filters)
+            .group_by(column)
+            .order_by(count.desc())
+            .limit(MAX_FACET_VALUES)
+        )
         result = await session.exec(statement)
-        book = result.first()
-        return book if book is not None else None
+        return {str(value): total for value, total in result.all()}
+
+    async def get_book_by_uid(
+        self, book_uid: uuid.UUID, session: AsyncSession, fields: tuple[str, ...] | None = None
+    ) -> Book | None:
+        return await session.get(Book, book_uid, options=self.column_options(fields, Book.version))
 
-    async def create_book(self, book_data: BookCreateModel, session: AsyncSession) -> Book:
+    async def create_book(self, book_data: BookCreateModel, user_uid: uuid.UUID, session: AsyncSession) -> Book:
         book_data_dict = book_data.model_dump()
-        new_book = Book(**book_data_dict)
+        new_book = Book(**book_data_dict, user_uid=user_uid)
         # new_book.published_date = datetime.strptime(book_data_dict['published_date'], '%Y-%m-%d')
 
         session.add(new_book)
         await session.commit()
+        await book_cache.bump()
 
         return new_book
 
-    async def update_book_by_uid(self, book_uid: str, update_data: BookUpdateModel, session: AsyncSession) -> Book | None:
-        book_to_update = await self.get_book_by_uid(book_uid, session)
-        if not book_to_update:
-            return None
+    async def bulk_create_books(
+        self, books: List[BookCreateModel], user_uid: uuid.UUID, session: AsyncSession
+    ) -> None:
+        now = datetime.utcnow()
+        records = [
+            (uuid.uuid4(), book.title, book.author, book.publisher, book.published_date,
+             book.page_count, book.language, user_uid, now, now)
+            for book in books
+        ]
 
-        update_data_dict = update_data.model_dump()
-        for k, v in update_data_dict.items():
-            setattr(book_to_update, k, v)
+        connection = await session.connection()
+        if connection.dialect.driver == 'asyncpg':
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                Book.__tablename__, records=records, columns=BULK_COLUMNS
+            )
+        else:
+            await connection.execute(insert(Book), [dict(zip(BULK_COLUMNS, record)) for record in records])
 
         await session.commit()
 
-        return book_to_update
+    async def import_books(
+        self,
+        rows: AsyncIterator[tuple[int, BookCreateModel | None, list | None]],
+        user_uid: uuid.UUID,
+        session: AsyncSession,
+    ) -> dict:
+        report = BookImportReport()
+        batch = []
+        async for line_no, book, errors in rows:
+            if errors is not None:
+                report.add_error(line_no, errors)
+                continue
 
-    async def delete_book_by_uid(self, book_uid: str, session: AsyncSession) -> bool:
-        book_to_delete = await self.get_book_by_uid(book_uid, session)
-        if not book_to_delete:
-            return None
+            batch.append((line_no, book))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await self._import_batch(batch, user_uid, report, session)
+                batch = []
+
+        if batch:
+            await self._import_batch(batch, user_uid, report, session)
+
+        if report.inserted:
+            await book_cache.bump()
+        return report.to_dict()
+
+    async def _import_batch(
+        self,
+        batch: list[tuple[int, BookCreateModel]],
+        user_uid: uuid.UUID,
+        report: BookImportReport,
+        session: AsyncSession,
+    ) -> None:
+        try:
+            await self.bulk_create_books([book for _, book in batch], user_uid, session)
+        except Exception as ex:
+            # A failed batch is reported line by line; the rest of the load goes on.
+            logger.exception('Bulk import batch failed.')
+            await session.rollback()
+            for line_no, _ in batch:
+                report.add_error(line_no, [{'type': 'database_error', 'msg': str(ex)}])
+        else:
+            report.inserted += len(batch)
+
+    async def update_book_by_uid(
+        self,
+        book_uid: uuid.UUID,
+        update_data: BookUpdateModel,
+        session: AsyncSession,
+        expected_version: int | None = None,
+        owner_uid: uuid.UUID | None = None,
+    ) -> Book | None:
+        '''Update a book; owner_uid restricts it to that owner, None allows any'''
+        values = update_data.model_dump(exclude_unset=True, exclude_none=True)
+        if not values:
+            book = await self.get_book_by_uid(book_uid, session)
+            if book is not None:
+                self._check_write(book, expected_version, owner_uid)
+            return book
 
-        await session.delete(book_to_delete)
+        # One round trip: the ownership and version checks, the partial update
+        # and reading the new row back all happen in a single UPDATE ... RETURNING.
+        statement = (
+            update(Book)
+            .where(*self._write_filters(book_uid, expected_version, owner_uid))
+            .values(**values, version=Book.version + 1)
+            .returning(Book)
+            .execution_options(synchronize_session=False)
+        )
+        book = (await session.exec(statement)).scalar_one_or_none()
         await session.commit()
 
+        if book is None:
+            return await self._explain_no_match(book_uid, expected_version, owner_uid, session)
+
+        await book_cache.bump()
+        return book
+
+    async def delete_book_by_uid(
+        self,
+        book_uid: uuid.UUID,
+        session: AsyncSession,
+        expected_version: int | None = None,
+        owner_uid: uuid.UUID | None = None,
+    ) -> bool | None:
+        '''Delete a book; owner_uid restricts it to that owner, None allows any'''
+        statement = (
+            delete(Book)
+            .where(*self._write_filters(book_uid, expected_version, owner_uid))
+            .returning(Book.uid)
+            .execution_options(synchronize_session=False)
+        )
+        deleted_uid = (await session.exec(statement)).scalar_one_or_none()
+        await session.commit()
+
+        if deleted_uid is None:
+            return await self._explain_no_match(book_uid, expected_version, owner_uid, session)
+
+        await book_cache.bump()
         return True
+
+    def _write_filters(
+        self, book_uid: uuid.UUID, expected_version: int | None, owner_uid: uuid.UUID | None
+    ) -> list[ColumnElement[bool]]:
+        filters = [Book.uid == book_uid]
+        if expected_version is not None:
+            filters.append(Book.version == expected_version)
+        if owner_uid is not None:
+            filters.append(Book.user_uid == owner_uid)
+        return filters
+
+    def _check_write(self, book: Book, expected_version: int | None, owner_uid: uuid.UUID | None) -> None:
+        if owner_uid is not None and book.user_uid != owner_uid:
+            raise BookNotOwned
+        if expected_version is not None and book.version != expected_version:
+            raise BookVersionConflict
+
+    async def _explain_no_match(
+        self,
+        book_uid: uuid.UUID,
+        expected_version: int | None,
+        owner_uid: uuid.UUID | None,
+        session: AsyncSession,
+    ) -> None:
+        # Only reached when nothing matched; tell another user's book or a
+        # stale If-Match from a missing book.
+        if expected_version is None and owner_uid is None:
+            return None
+
+        statement = select(Book).where(Book.uid == book_uid).options(load_only(Book.user_uid, Book.version))
+        book = (await session.exec(statement)).first()
+        if book is not None:
+            self._check_write(book, expected_version, owner_uid)
+        return None
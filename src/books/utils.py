@@ -0,0 +1,132 @@
+import base64
+import binascii
+import csv
+import json
+import uuid
+from datetime import datetime
+from typing import AsyncIterator
+
+from pydantic import ValidationError
+
+from src.books.schemas import BookCreateModel
+from src.errors import BookVersionConflict, InvalidCursor, InvalidInclude
+
+BOOK_INCLUDES = frozenset({'user', 'rating', 'reviews'})
+MAX_IMPORT_LINE_BYTES = 64 * 1024
+
+
+def encode_cursor(created_at: datetime, uid: uuid.UUID) -> str:
+    payload = json.dumps(
+        {'created_at': created_at.isoformat(), 'uid': str(uid)},
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload['created_at']), uuid.UUID(payload['uid'])
+    except (binascii.Error, ValueError, KeyError, TypeError) as ex:
+        raise InvalidCursor from ex
+
+
+def version_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def parse_if_match(if_match: str | None) -> int | None:
+    '''Return the version required by an If-Match header, None if any will do'''
+    if if_match is None or if_match.strip() == '*':
+        return None
+
+    try:
+        return int(if_match.strip().strip('"'))
+    except ValueError as ex:
+        # Not one of our ETags, so it can never match the current version.
+        raise BookVersionConflict from ex
+
+
+def parse_includes(include: str | None) -> frozenset[str]:
+    '''Relations named in a comma-separated include= parameter'''
+    if not include:
+        return frozenset()
+
+    includes = frozenset(name.strip() for name in include.split(',') if name.strip())
+    if not includes <= BOOK_INCLUDES:
+        raise InvalidInclude
+    return includes
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_bytes: int = MAX_IMPORT_LINE_BYTES
+) -> AsyncIterator[bytes | None]:
+    '''Split a byte stream into lines; a line over max_bytes is dropped and yielded as None'''
+    buffer = bytearray()
+    overflow = False
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b'\n', start)) != -1:
+            if overflow or end - start > max_bytes:
+                yield None
+                overflow = False
+            else:
+                yield bytes(buffer[start:end]).rstrip(b'\r')
+            start = end + 1
+        del buffer[:start]
+
+        # Only the unterminated tail is kept, and never more than max_bytes of it.
+        if len(buffer) > max_bytes:
+            overflow = True
+            buffer.clear()
+
+    if overflow:
+        yield None
+    elif buffer:
+        yield bytes(buffer).rstrip(b'\r')
+
+
+def _line_error(error_type: str, msg: str) -> list[dict]:
+    return [{'type': error_type, 'loc': [], 'msg': msg}]
+
+
+async def parse_book_rows(
+    lines: AsyncIterator[bytes | None], is_csv: bool
+) -> AsyncIterator[tuple[int, BookCreateModel | None, list | None]]:
+    '''Yield (line number, book, errors) for every non-blank line.
+
+    CSV input needs a header row and one record per line; quoted fields
+    spanning several lines are not supported. Overlong lines and lines
+    that are not valid UTF-8 are reported like rows that fail validation.
+    '''
+    header = None
+    line_no = 0
+    async for raw_line in lines:
+        line_no += 1
+        if raw_line is None:
+            yield line_no, None, _line_error('line_too_long', f'Line is longer than {MAX_IMPORT_LINE_BYTES} bytes')
+            continue
+
+        try:
+            line = raw_line.decode('utf-8')
+        except UnicodeDecodeError:
+            yield line_no, None, _line_error('invalid_utf8', 'Line is not valid UTF-8')
+            continue
+
+        if not line.strip():
+            continue
+
+        try:
+            if not is_csv:
+                yield line_no, BookCreateModel.model_validate_json(line), None
+            elif header is None:
+                header = next(csv.reader([line]))
+            else:
+                row = dict(zip(header, next(csv.reader([line]))))
+                yield line_no, BookCreateModel.model_validate(row), None
+        except ValidationError as ex:
+            yield line_no, None, ex.errors(include_url=False, include_context=False, include_input=False)
+        except csv.Error as ex:
+            yield line_no, None, [{'type': 'csv_error', 'msg': str(ex)}]
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Protocol, TypeVar
+
+from src.redis import redis_subscriber
+
+V = TypeVar('V')
+
+LISTENER_RETRY_DELAY = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache(Generic[V]):
+    '''Bounded LRU mapping whose entries expire at an absolute unix timestamp'''
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, tuple[V, float]] = OrderedDict()
+
+    def get(self, key: Hashable) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: V, expires_at: float) -> bool:
+        '''Store value until expires_at; return True if a live entry was evicted for room'''
+        now = time.time()
+        if expires_at <= now:
+            return False
+
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        evicted = False
+        while len(self._entries) > self.maxsize:
+            _, (_, evicted_expires_at) = self._entries.popitem(last=False)
+            evicted = evicted or evicted_expires_at > now
+        return evicted
+
+    def pop(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class LocalCache(Protocol):
+    listening: bool
+
+    def clear(self) -> None: ...
+
+
+_handlers: dict[str, Callable[[str], None]] = {}
+_local_caches: list[LocalCache] = []
+
+
+def register_invalidation(channel: str, handler: Callable[[str], None], cache: LocalCache) -> None:
+    '''Route messages on a Redis channel to handler for as long as the listener runs'''
+    _handlers[channel] = handler
+    if cache not in _local_caches:
+        _local_caches.append(cache)
+
+
+def _set_listening(listening: bool) -> None:
+    # Anything cached while unsubscribed may have missed an invalidation.
+    for cache in _local_caches:
+        cache.clear()
+        cache.listening = listening
+
+
+async def run_invalidation_listener() -> None:
+    while True:
+        pubsub = redis_subscriber.pubsub()
+        try:
+            await pubsub.subscribe(*_handlers)
+            subscriptions = 0
+            async for message in pubsub.listen():
+                if message['type'] == 'subscribe':
+                    subscriptions += 1
+                    if subscriptions == len(_handlers):
+                        _set_listening(True)
+                elif message['type'] == 'message':
+                    _handlers[message['channel'].decode()](message['data'].decode())
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:
+            logger.warning('Cache invalidation listener disconnected: %s', ex)
+        finally:
+            _set_listening(False)
+            await pubsub.aclose()
+
+        await asyncio.sleep(LISTENER_RETRY_DELAY)
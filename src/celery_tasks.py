@@ -1,7 +1,21 @@
-from celery import Celery
-from asgiref.sync import async_to_sync
-from src.mail import create_message, mail
+import json
+import math
+
+from celery import Celery, Task
+from celery.signals import worker_process_init, worker_process_shutdown
+from celery.utils.log import get_task_logger
+
+from redis import Redis
 from src.config import Config
+from src.mail import build_email, precompile_templates, render_template, smtp_session
+
+MAIL_QUEUE_KEY = 'bookly:mail_queue'
+MAIL_FLUSH_SCHEDULED_KEY = 'bookly:mail_flush_scheduled'
+MAIL_MAX_ATTEMPTS = 3
+# Seconds before the first retry of a failed email, doubled for each one after.
+MAIL_RETRY_BACKOFF = 10
+
+logger = get_task_logger(__name__)
 
 c_app = Celery('tasks')
 # c_app.config_from_object("src.config")
@@ -45,8 +59,86 @@ c_app.conf.update(
     redis_max_connections=20,  # Max Redis connections per worker
 )
 
+mail_queue = Redis.from_url(Config.REDIS_URL)
+
+
+def queue_email(recipients: list[str], subject: str, template_name: str, context: dict) -> None:
+    '''Queue an email for the next batch, scheduling a flush if none is pending.
+
+    Only the template name and its context travel through Redis; the HTML
+    is rendered by the worker that sends it. The Redis and broker clients
+    are synchronous, so async callers run this with asyncio.to_thread.
+    '''
+    payload = json.dumps({
+        'recipients': recipients,
+        'subject': subject,
+        'template': template_name,
+        'context': context,
+        'attempts': 0,
+    })
+    queued = mail_queue.rpush(MAIL_QUEUE_KEY, payload)
+
+    # At most one flush is pending at a time, whatever the burst size; a
+    # full batch just skips the linger.
+    if _claim_flush():
+        countdown = 0 if queued >= Config.MAIL_BATCH_SIZE else Config.MAIL_BATCH_LINGER
+        flush_email_queue.apply_async(countdown=countdown)
+
+
+def _claim_flush() -> bool:
+    return bool(mail_queue.set(MAIL_FLUSH_SCHEDULED_KEY, 1, nx=True, ex=math.ceil(Config.MAIL_BATCH_LINGER) + 30))
+
+
 @c_app.task()
 def send_email(recipients: list[str], subject: str, body: str) -> None:
-    message = create_message(recipients, subject, body)
-    async_to_sync(mail.send_message)(message)
-    print('Email sent!')
+    smtp_session.send(build_email(recipients, subject, body))
+    logger.info('Email sent!')
+
+
+@c_app.task()
+def flush_email_queue() -> int:
+    # Clear the flag first so mail queued from now on schedules its own flush.
+    mail_queue.delete(MAIL_FLUSH_SCHEDULED_KEY)
+    batch = mail_queue.lpop(MAIL_QUEUE_KEY, Config.MAIL_BATCH_SIZE) or []
+
+    sent = 0
+    for raw in batch:
+        payload = json.loads(raw)
+        try:
+            _send_queued(payload)
+            sent += 1
+        except Exception:
+            logger.exception('Sending queued email to %s failed.', payload['recipients'])
+            # Retried on its own after a backoff rather than in the next batch.
+            retry_email.apply_async((payload,), countdown=MAIL_RETRY_BACKOFF)
+
+    if mail_queue.llen(MAIL_QUEUE_KEY) and _claim_flush():
+        flush_email_queue.delay()
+
+    logger.info('Sent %s of %s queued emails.', sent, len(batch))
+    return sent
+
+
+@c_app.task(bind=True, max_retries=MAIL_MAX_ATTEMPTS - 2)
+def retry_email(self: Task, payload: dict) -> None:
+    '''Second and later attempts at a queued email, backing off exponentially'''
+    try:
+        _send_queued(payload)
+    except Exception as ex:
+        logger.warning('Retrying email to %s failed: %s', payload['recipients'], ex)
+        raise self.retry(exc=ex, countdown=MAIL_RETRY_BACKOFF * 2 ** (self.request.retries + 1)) from ex
+
+
+def _send_queued(payload: dict) -> None:
+    body = render_template(payload['template'], payload['context'])
+    smtp_session.send(build_email(payload['recipients'], payload['subject'], body))
+
+
+@worker_process_init.connect
+def load_templates(**kwargs: object) -> None:
+    precompile_templates()
+
+
+@worker_process_shutdown.connect
+def close_smtp_session(**kwargs: object) -> None:
+    smtp_session.close()
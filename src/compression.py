@@ -0,0 +1,233 @@
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config import Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_WBITS = zlib.MAX_WBITS | 16
+MAX_NEGOTIATIONS = 256
+COMPRESSIBLE_TYPES = frozenset({
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+})
+
+
+class StreamEncoder(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+@dataclass(frozen=True)
+class Codec:
+    '''A content coding with the levels used for live and cached responses'''
+
+    name: str
+    level: int
+    cached_level: int
+    compress: Callable[[bytes, int], bytes]
+    stream: Callable[[int], StreamEncoder]
+
+
+class _GzipStream:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        # A sync flush per chunk lets clients decode streamed rows as they arrive.
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdStream:
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def _build_codecs() -> dict[str, Codec]:
+    # In order of preference when a client accepts several.
+    codecs = {}
+    if brotli is not None:
+        codecs['br'] = Codec(
+            'br',
+            Config.COMPRESSION_BROTLI_QUALITY,
+            cached_level=9,
+            compress=lambda data, quality: brotli.compress(data, quality=quality),
+            stream=_BrotliStream,
+        )
+    if zstandard is not None:
+        codecs['zstd'] = Codec(
+            'zstd',
+            Config.COMPRESSION_ZSTD_LEVEL,
+            cached_level=12,
+            compress=lambda data, level: zstandard.ZstdCompressor(level=level).compress(data),
+            stream=_ZstdStream,
+        )
+    codecs['gzip'] = Codec(
+        'gzip',
+        Config.COMPRESSION_GZIP_LEVEL,
+        cached_level=9,
+        compress=lambda data, level: zlib.compress(data, level, wbits=GZIP_WBITS),
+        stream=_GzipStream,
+    )
+    return codecs
+
+
+CODECS = _build_codecs()
+_negotiated: dict[str, Codec | None] = {}
+
+
+def negotiate(accept_encoding: str | None) -> Codec | None:
+    '''Pick our preferred codec among those the client accepts'''
+    if not accept_encoding:
+        return None
+
+    # Clients send only a handful of distinct Accept-Encoding values.
+    if accept_encoding in _negotiated:
+        return _negotiated[accept_encoding]
+
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    codec = next((codec for name, codec in CODECS.items() if accepted.get(name, accepted.get('*', 0)) > 0), None)
+    if len(_negotiated) < MAX_NEGOTIATIONS:
+        _negotiated[accept_encoding] = codec
+    return codec
+
+
+def choose_codec(accept_encoding: str | None, size: int) -> Codec | None:
+    '''Codec for a body of the given size, None if it should be sent as is'''
+    if not Config.COMPRESSION_ENABLED or size < Config.COMPRESSION_MIN_SIZE:
+        return None
+    return negotiate(accept_encoding)
+
+
+def _is_compressible(headers: MutableHeaders) -> bool:
+    if 'content-encoding' in headers:
+        return False
+
+    content_type = headers.get('content-type', '').split(';')[0].strip()
+    return content_type.startswith('text/') or content_type in COMPRESSIBLE_TYPES
+
+
+def _encode_chunk(encoder: StreamEncoder, message: Message) -> Message:
+    if message['type'] != 'http.response.body':
+        return message
+
+    body = encoder.compress(message.get('body', b''))
+    if not message.get('more_body', False):
+        body += encoder.finish()
+    return {**message, 'body': body}
+
+
+class CompressionMiddleware:
+    '''Compresses responses with the client's best supported codec.
+
+    Complete bodies below minimum_size are sent as is. Streamed bodies are
+    compressed chunk by chunk and flushed after each one. Responses that
+    already carry a Content-Encoding, such as precompressed cache entries,
+    pass through untouched.
+    '''
+
+    def __init__(self, app: ASGIApp, minimum_size: int) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        codec = negotiate(Headers(scope=scope).get('accept-encoding'))
+        if codec is None:
+            await self.app(scope, receive, send)
+            return
+
+        response_start: Message | None = None
+        encoder: StreamEncoder | None = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_start, encoder
+            if message['type'] == 'http.response.start':
+                response_start = message
+                return
+
+            if response_start is None:
+                await send(message if encoder is None else _encode_chunk(encoder, message))
+                return
+
+            start, response_start = response_start, None
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            headers = MutableHeaders(scope=start)
+            if (
+                message['type'] != 'http.response.body'
+                or not _is_compressible(headers)
+                or (not more_body and len(body) < self.minimum_size)
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            headers['Content-Encoding'] = codec.name
+            headers.add_vary_header('Accept-Encoding')
+            etag = headers.get('etag')
+            if etag and not etag.startswith('W/'):
+                headers['ETag'] = 'W/' + etag
+
+            if more_body:
+                del headers['Content-Length']
+                encoder = codec.stream(codec.level)
+                body = encoder.compress(body)
+            else:
+                body = codec.compress(body, codec.level)
+                headers['Content-Length'] = str(len(body))
+
+            await send(start)
+            await send({**message, 'body': body})
+
+        await self.app(scope, receive, send_wrapper)
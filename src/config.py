@@ -1,11 +1,60 @@
+from datetime import datetime
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # JSON list in the environment, e.g. ["postgresql+asyncpg://...@replica1/bookly"].
+    DATABASE_REPLICA_URLS: list[str] = []
+    DB_PRIMARY_PIN_SECONDS: float = 5.0
+    DB_REPLICA_EJECT_SECONDS: float = 30.0
+    DB_REPLICA_MAX_LAG: float = 10.0
+    DB_REPLICA_HEALTH_INTERVAL: float = 5.0
+    QUERY_PROFILER_ENABLED: bool = False
+    QUERY_PROFILER_SAMPLE_RATE: float = 1.0
+    QUERY_PROFILER_SLOW_MS: float = 100.0
+    QUERY_PROFILER_N_PLUS_ONE: int = 10
     JWT_KEY: str
     JWT_ALGORITHM: str
+    JWT_KEYS_DIR: str | None = None
+    JWT_ACTIVE_KID: str | None = None
+    # With JWT_KEYS_DIR set, tokens signed with JWT_KEY are rejected unless
+    # this is set and still in the future (migration grace period).
+    JWT_LEGACY_ACCEPT_UNTIL: datetime | None = None
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL: int = 300
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: int = 60
+    USER_CACHE_REDIS: bool = True
+    BOOK_CACHE_SIZE: int = 256
+    BOOK_CACHE_TTL: int = 300
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
     REDIS_URL: str
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 5.0
+    REDIS_SOCKET_TIMEOUT: float = 2.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    TOKEN_BLOCKLIST_BACKEND: Literal['redis', 'memory'] = 'redis'
+    SESSION_STORE_BACKEND: Literal['redis', 'memory'] = 'redis'
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_DEFAULT: int = 600
+    RATE_LIMIT_WINDOW: int = 60
+    RATE_LIMIT_LOCAL_KEYS: int = 10000
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    # Levels for responses compressed per request; lower trades size for CPU.
+    COMPRESSION_GZIP_LEVEL: int = 5
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
 
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
@@ -13,6 +62,14 @@ class Settings(BaseSettings):
     MAIL_PORT: int
     MAIL_SERVER: str
     MAIL_FROM_NAME: str
+    MAIL_STARTTLS: bool = True
+    MAIL_TIMEOUT: float = 10.0
+    MAIL_BATCH_SIZE: int = 50
+    MAIL_BATCH_LINGER: float = 2.0
+    MAIL_TEMPLATE_CACHE_DIR: str | None = None
+    APP_URL: str = 'http://localhost:8000'
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL: float = 1.0
 
     model_config = SettingsConfigDict(
         env_file='.env',
@@ -1,24 +1,307 @@
-from sqlalchemy.ext.asyncio import AsyncEngine
-from sqlalchemy.orm import sessionmaker
-from sqlmodel import SQLModel, create_engine
+import asyncio
+import itertools
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncGenerator
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import Connection, make_url
+from sqlalchemy.engine.interfaces import DBAPIConnection, DBAPICursor, ExecutionContext
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    ConnectionPoolEntry,
+    PoolProxiedConnection,
+)
+from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src.config import Config
+from src.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUTS,
+    DB_POOL_TIMEOUTS,
+    DB_POOL_WAIT_SECONDS,
+    DB_READS,
+    DB_REPLICA_HEALTHY,
+)
+from src.profiling import query_profiler
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_PIN_COOKIE = 'bookly_primary_until'
+# Zero when the replica has replayed everything it received, otherwise the
+# age of the last replayed transaction; NULL (no lag) on a non-replica.
+REPLICA_LAG_QUERY = text(
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    '''Queue pool that records how long callers wait for a connection'''
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+
+def _connect_args(url: str) -> dict:
+    if make_url(url).drivername == 'postgresql+asyncpg':
+        return {'prepared_statement_cache_size': Config.DB_STATEMENT_CACHE_SIZE}
+    return {}
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=Config.DB_POOL_SIZE,
+        max_overflow=Config.DB_MAX_OVERFLOW,
+        pool_timeout=Config.DB_POOL_TIMEOUT,
+        pool_recycle=Config.DB_POOL_RECYCLE,
+        pool_pre_ping=Config.DB_POOL_PRE_PING,
+        connect_args=_connect_args(url),
+    )
+    if Config.QUERY_PROFILER_ENABLED:
+        query_profiler.attach(engine.sync_engine)
+    return engine
+
+
+async_engine = _create_engine(Config.DATABASE_URL)
+
+async_session_maker = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
+
+@event.listens_for(async_engine.sync_engine.pool, 'checkout')
+def _on_checkout(
+    dbapi_connection: DBAPIConnection,
+    connection_record: ConnectionPoolEntry,
+    connection_proxy: PoolProxiedConnection,
+) -> None:
+    DB_POOL_CHECKOUTS.inc()
+    DB_POOL_CHECKED_OUT.inc()
+
+
+@event.listens_for(async_engine.sync_engine.pool, 'checkin')
+def _on_checkin(dbapi_connection: DBAPIConnection, connection_record: ConnectionPoolEntry) -> None:
+    DB_POOL_CHECKED_OUT.dec()
+
+
+@dataclass
+class Replica:
+    name: str
+    engine: AsyncEngine
+    session_maker: async_sessionmaker
+    ejected_until: float = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until <= time.monotonic()
+
+
+class ReplicaSet:
+    '''Read replicas taken in round-robin order, skipping ejected ones.
+
+    A replica is ejected for eject_seconds when a connection to it fails
+    or when a health check finds it unreachable or lagging by more than
+    max_lag seconds; a passing health check readmits it.
+    '''
+
+    def __init__(self, urls: list[str], eject_seconds: float, max_lag: float) -> None:
+        self.eject_seconds = eject_seconds
+        self.max_lag = max_lag
+        self.replicas = []
+        for index, url in enumerate(urls):
+            engine = _create_engine(url)
+            maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+            self.replicas.append(Replica(f'replica{index}', engine, maker))
+        self._next = itertools.count()
+
+    def candidates(self) -> list[Replica]:
+        '''Healthy replicas, starting with the next one in turn'''
+        if not self.replicas:
+            return []
+
+        start = next(self._next) % len(self.replicas)
+        ordered = self.replicas[start:] + self.replicas[:start]
+        return [replica for replica in ordered if replica.healthy]
+
+    def eject(self, replica: Replica, reason: object) -> None:
+        if replica.healthy:
+            logger.warning('Ejecting %s from reads for %ss: %s', replica.name, self.eject_seconds, reason)
+        replica.ejected_until = time.monotonic() + self.eject_seconds
+        DB_REPLICA_HEALTHY.labels(replica.name).set(0)
+
+    def readmit(self, replica: Replica) -> None:
+        if not replica.healthy:
+            logger.info('Readmitting %s to reads.', replica.name)
+        replica.ejected_until = 0.0
+        DB_REPLICA_HEALTHY.labels(replica.name).set(1)
+
+    async def check(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as conn:
+                lag = (await conn.execute(REPLICA_LAG_QUERY)).scalar()
+        except (exc.DBAPIError, OSError, asyncio.TimeoutError) as ex:
+            self.eject(replica, ex)
+            return
 
-async_engine = AsyncEngine(create_engine(url=Config.DATABASE_URL))
+        if lag is not None and lag > self.max_lag:
+            self.eject(replica, f'{lag:.1f}s behind the primary')
+        else:
+            self.readmit(replica)
+
+    async def run_health_checks(self, interval: float) -> None:
+        while True:
+            await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+            await asyncio.sleep(interval)
+
+    async def close(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+replica_set = ReplicaSet(
+    Config.DATABASE_REPLICA_URLS,
+    eject_seconds=Config.DB_REPLICA_EJECT_SECONDS,
+    max_lag=Config.DB_REPLICA_MAX_LAG,
+)
+
+
+@dataclass
+class ReadRouting:
+    '''Per-request routing state; pinned sends reads to the primary'''
+
+    pinned: bool
+    wrote: bool = False
+
+
+_read_routing: ContextVar[ReadRouting | None] = ContextVar('read_routing', default=None)
+
+
+@event.listens_for(async_engine.sync_engine, 'after_cursor_execute')
+def _on_primary_execute(
+    conn: Connection,
+    cursor: DBAPICursor,
+    statement: str,
+    parameters: object,
+    context: ExecutionContext,
+    executemany: bool,
+) -> None:
+    if context.isinsert or context.isupdate or context.isdelete:
+        routing = _read_routing.get()
+        if routing is not None:
+            # Later reads in this request, and the client's next requests
+            # for a while, must see this write.
+            routing.pinned = routing.wrote = True
+
+
+class PrimaryPinMiddleware:
+    '''Pins a client's reads to the primary for a while after it writes.
+
+    The pin travels in a cookie, so it holds across workers; clients that
+    drop cookies may read their own writes only after replication.
+    '''
+
+    def __init__(self, app: ASGIApp, pin_seconds: float) -> None:
+        self.app = app
+        self.pin_seconds = pin_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        routing = ReadRouting(pinned=self._pinned_until(scope) > time.time())
+        token = _read_routing.set(routing)
+
+        async def send_wrapper(message: Message) -> None:
+            if message['type'] == 'http.response.start' and routing.wrote:
+                until = time.time() + self.pin_seconds
+                cookie = (
+                    f'{PRIMARY_PIN_COOKIE}={until:.0f}; Max-Age={self.pin_seconds:.0f}; '
+                    'Path=/; HttpOnly; SameSite=Lax'
+                )
+                message.setdefault('headers', []).append((b'set-cookie', cookie.encode('latin-1')))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _read_routing.reset(token)
+
+    @staticmethod
+    def _pinned_until(scope: Scope) -> float:
+        for name, value in scope['headers']:
+            if name != b'cookie':
+                continue
+            for part in value.decode('latin-1').split(';'):
+                key, _, until = part.strip().partition('=')
+                if key == PRIMARY_PIN_COOKIE:
+                    try:
+                        return float(until)
+                    except ValueError:
+                        return 0.0
+        return 0.0
 
 
 async def init_db() -> None:
     async with async_engine.begin() as conn:
+        if conn.dialect.name == 'postgresql':
+            # Needed by the trigram indexes on books.
+            await conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
         await conn.run_sync(SQLModel.metadata.create_all)
 
 
-async def get_session() -> AsyncSession:
-    Session = sessionmaker(
-        bind=async_engine,
-        class_=AsyncSession,
-        expire_on_commit=False
-    )
+async def close_db() -> None:
+    await async_engine.dispose()
+    await replica_set.close()
+
+
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    async with async_session_maker() as session:
+        yield session
+
+
+async def open_read_session() -> AsyncSession:
+    '''A session on a healthy replica, or on the primary if none or if pinned.
+
+    The connection is checked out up front so an unreachable replica is
+    ejected and the next one tried before any query is issued.
+    '''
+    routing = _read_routing.get()
+    if routing is None or not routing.pinned:
+        for replica in replica_set.candidates():
+            session = replica.session_maker()
+            try:
+                await session.connection()
+            except (exc.DBAPIError, OSError, asyncio.TimeoutError) as ex:
+                await session.close()
+                replica_set.eject(replica, ex)
+                continue
+
+            DB_READS.labels(replica.name).inc()
+            return session
+
+    DB_READS.labels('primary').inc()
+    return async_session_maker()
+
 
-    async with Session() as session:
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    '''Session for handlers that only read and can tolerate replication lag'''
+    async with await open_read_session() as session:
         yield session
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends, Query
+
+from src.auth.dependencies import RoleChecker
+from src.profiling import query_profiler
+
+debug_router = APIRouter()
+admin_checker = RoleChecker(allowed_roles=['admin'])
+
+
+@debug_router.get('/queries', dependencies=[Depends(admin_checker)])
+async def get_query_profile(limit: int = Query(50, ge=1, le=500)) -> dict:
+    return query_profiler.report(limit)
@@ -25,13 +25,75 @@ class RefreshTokenRequired(BooklyException):
     pass
 
 
+class InvalidCursor(BooklyException):
+    '''User provided a malformed pagination cursor'''
+    pass
+
+
+class InvalidFields(BooklyException):
+    '''User asked for a field the resource does not have'''
+    pass
+
+
+class InvalidInclude(BooklyException):
+    '''User asked to include a relation that books do not have'''
+    pass
+
+
+class BookNotFound(BooklyException):
+    '''Book with the given uid does not exist'''
+    pass
+
+
+class BookNotOwned(BooklyException):
+    '''Book belongs to another user'''
+    pass
+
+
+class BookVersionConflict(BooklyException):
+    '''Book was changed since the version the user sent in If-Match'''
+    pass
+
+
+class ReviewNotFound(BooklyException):
+    '''Review does not exist or belongs to another user'''
+    pass
+
+
+class ReviewAlreadyExists(BooklyException):
+    '''User already reviewed this book'''
+    pass
+
+
+class PasswordHasherBusy(BooklyException):
+    '''Too many password hashing calls are already queued'''
+    pass
+
+
+class RateLimitExceeded(BooklyException):
+    '''User sent more requests than a rate limit allows'''
+
+    def __init__(self, headers: dict[str, str]) -> None:
+        super().__init__()
+        self.headers = headers
+
+
+RATE_LIMITED_DETAIL = {
+    'message': 'Too many requests',
+    'resolution': 'Please wait for the time given in Retry-After and try again',
+    'error_code': 'rate_limited',
+}
+
+
 def create_exception_handler(
-    status_code: int, initial_detail: Any
+    status_code: int, initial_detail: Any, headers: dict[str, str] | None = None
 ) -> Callable[[Request, Exception], JSONResponse]:
     async def exception_handler(request: Request, exc: BooklyException) -> JSONResponse:
+        # Exceptions may carry per-request headers, e.g. Retry-After.
         return JSONResponse(
             status_code=status_code,
-            content=initial_detail
+            content=initial_detail,
+            headers={**(headers or {}), **getattr(exc, 'headers', {})} or None,
         )
     return exception_handler
 
@@ -73,6 +135,120 @@ def register_exception_handlers(app: FastAPI) -> None:
         )
     )
 
+    app.add_exception_handler(
+        InvalidCursor,
+        create_exception_handler(
+            status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                'message': 'The pagination cursor is invalid',
+                'resolution': 'Please restart pagination without a cursor',
+                'error_code': 'invalid_cursor',
+            },
+        )
+    )
+
+    app.add_exception_handler(
+        InvalidFields,
+        create_exception_handler(
+            status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                'message': 'The fields parameter names an unknown field',
+                'resolution': 'Please list only fields of the response, separated by commas',
+                'error_code': 'invalid_fields',
+            },
+        )
+    )
+
+    app.add_exception_handler(
+        InvalidInclude,
+        create_exception_handler(
+            status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                'message': 'The include parameter names an unknown relation',
+                'resolution': 'Please include only user, rating or reviews, separated by commas',
+                'error_code': 'invalid_include',
+            },
+        )
+    )
+
+    app.add_exception_handler(
+        BookNotFound,
+        create_exception_handler(
+            status.HTTP_404_NOT_FOUND,
+            initial_detail={
+                'message': 'Book not found',
+                'resolution': 'Please check the book uid',
+                'error_code': 'book_not_found',
+            },
+        )
+    )
+
+    app.add_exception_handler(
+        BookNotOwned,
+        create_exception_handler(
+            status.HTTP_403_FORBIDDEN,
+            initial_detail={
+                'message': 'You can only change books you added',
+                'resolution': 'Please ask the book owner or an admin',
+                'error_code': 'book_not_owned',
+            },
+        )
+    )
+
+    app.add_exception_handler(
+        BookVersionConflict,
+        create_exception_handler(
+            status.HTTP_412_PRECONDITION_FAILED,
+            initial_detail={
+                'message': 'The book was modified by someone else',
+                'resolution': 'Please fetch the book again and retry with its current ETag',
+                'error_code': 'book_version_conflict',
+            },
+        )
+    )
+
+    app.add_exception_handler(
+        ReviewNotFound,
+        create_exception_handler(
+            status.HTTP_404_NOT_FOUND,
+            initial_detail={
+                'message': 'Review not found',
+                'resolution': 'Please check the review uid',
+                'error_code': 'review_not_found',
+            },
+        )
+    )
+
+    app.add_exception_handler(
+        ReviewAlreadyExists,
+        create_exception_handler(
+            status.HTTP_409_CONFLICT,
+            initial_detail={
+                'message': 'You have already reviewed this book',
+                'resolution': 'Please update your existing review instead',
+                'error_code': 'review_already_exists',
+            },
+        )
+    )
+
+    app.add_exception_handler(
+        PasswordHasherBusy,
+        create_exception_handler(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            initial_detail={
+                'message': 'The server is busy processing other sign-ins',
+                'resolution': 'Please try again shortly',
+                'error_code': 'server_busy',
+            },
+            headers={'Retry-After': '1'},
+        )
+    )
+
+    app.add_exception_handler(
+        RateLimitExceeded,
+        create_exception_handler(status.HTTP_429_TOO_MANY_REQUESTS, initial_detail=RATE_LIMITED_DETAIL)
+    )
+
     @app.exception_handler(500)
     async def internal_server_error(request: Request, exc: Exception) -> JSONResponse:
         return JSONResponse(
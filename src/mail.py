@@ -1,33 +1,116 @@
+import logging
+import smtplib
+import ssl
+from email.message import EmailMessage
+from email.utils import formataddr
 from pathlib import Path
 
-from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    select_autoescape,
+)
 
 from src.config import Config
 
 BASE_DIR = Path(__file__).resolve().parent
+TEMPLATE_FOLDER = Path(BASE_DIR, 'templates')
 
+logger = logging.getLogger(__name__)
 
-mail_config = ConnectionConfig(
-    MAIL_USERNAME=Config.MAIL_USERNAME,
-    MAIL_PASSWORD=Config.MAIL_PASSWORD,
-    MAIL_FROM=Config.MAIL_FROM,
-    MAIL_PORT=587,
-    MAIL_SERVER=Config.MAIL_SERVER,
-    MAIL_FROM_NAME=Config.MAIL_FROM_NAME,
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    # TEMPLATE_FOLDER=Path(BASE_DIR, 'templates'),
+# auto_reload is off so a template is loaded once per process; the bytecode
+# cache lets freshly forked workers skip parsing entirely.
+template_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_FOLDER),
+    bytecode_cache=FileSystemBytecodeCache(directory=Config.MAIL_TEMPLATE_CACHE_DIR),
+    autoescape=select_autoescape(['html']),
+    auto_reload=False,
 )
+template_env.globals['app_url'] = Config.APP_URL
+
+
+def precompile_templates() -> None:
+    for name in template_env.list_templates(extensions=['html']):
+        template_env.get_template(name)
+
+
+def render_template(template_name: str, context: dict) -> str:
+    return template_env.get_template(template_name).render(context)
 
-mail = FastMail(config=mail_config)
 
-def create_message(recipients: list[str], subject: str, body: str) -> MessageSchema:
-    message = MessageSchema(
-        subject=subject,
-        body=body,
-        recipients=recipients,
-        subtype=MessageType.html,
-    )
+def build_email(recipients: list[str], subject: str, body: str) -> EmailMessage:
+    message = EmailMessage()
+    message['Subject'] = subject
+    message['From'] = formataddr((Config.MAIL_FROM_NAME, Config.MAIL_FROM))
+    message['To'] = ', '.join(recipients)
+    message.set_content(body, subtype='html')
     return message
+
+
+class SMTPSession:
+    '''One long-lived SMTP connection that reconnects when the server drops it'''
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str | None,
+        password: str | None,
+        starttls: bool,
+        timeout: float,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._smtp: smtplib.SMTP | None = None
+
+    def send(self, message: EmailMessage) -> None:
+        try:
+            self._connection().send_message(message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # The server closed an idle session; retry once on a fresh one.
+            self.close()
+            self._connection().send_message(message)
+
+    def close(self) -> None:
+        if self._smtp is None:
+            return
+
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            return self._smtp
+
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                # Verify the server's certificate and hostname before sending credentials.
+                smtp.starttls(context=ssl.create_default_context())
+            if self.username:
+                smtp.login(self.username, self.password)
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+            raise
+
+        logger.info('Opened SMTP session to %s:%s', self.host, self.port)
+        self._smtp = smtp
+        return smtp
+
+
+smtp_session = SMTPSession(
+    host=Config.MAIL_SERVER,
+    port=Config.MAIL_PORT,
+    username=Config.MAIL_USERNAME,
+    password=Config.MAIL_PASSWORD,
+    starttls=Config.MAIL_STARTTLS,
+    timeout=Config.MAIL_TIMEOUT,
+)
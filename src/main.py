@@ -1,13 +1,21 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from typing import AsyncGenerator
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
-from src.auth.routes import auth_router
+from src.auth.routes import auth_router, jwks_router
 from src.books.routes import book_router
-from src.database import init_db
+from src.cache import run_invalidation_listener
+from src.config import Config
+from src.database import close_db, init_db, replica_set
+from src.debug.routes import debug_router
 from src.errors import register_exception_handlers
-from src.middleware import register_middleware
+from src.metrics import metrics_router
+from src.middleware import register_middleware, start_access_log, stop_access_log
+from src.redis import close_redis
+from src.reviews.routes import review_router
 
 version = 'v1'
 
@@ -15,9 +23,22 @@ version = 'v1'
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     print('Server is starting...')
+    start_access_log()
     await init_db()
+    background_tasks = [asyncio.create_task(run_invalidation_listener())]
+    if replica_set.replicas:
+        background_tasks.append(
+            asyncio.create_task(replica_set.run_health_checks(Config.DB_REPLICA_HEALTH_INTERVAL))
+        )
     yield
     print('Server is stopping...')
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await close_db()
+    await close_redis()
+    stop_access_log()
 
 
 app = FastAPI(
@@ -25,10 +46,17 @@ app = FastAPI(
     title='Bookly',
     description='A REST API for a book review web service',
     version=version,
+    default_response_class=ORJSONResponse,
 )
 
 register_exception_handlers(app)
 register_middleware(app)
 
+app.include_router(metrics_router)
+app.include_router(jwks_router)
 app.include_router(auth_router, prefix=f'/api/{version}/auth', tags=['auth'])
 app.include_router(book_router, prefix=f'/api/{version}/books', tags=['books'])
+app.include_router(review_router, prefix=f'/api/{version}/reviews', tags=['reviews'])
+
+if Config.QUERY_PROFILER_ENABLED:
+    app.include_router(debug_router, prefix=f'/api/{version}/debug', tags=['debug'])
@@ -0,0 +1,83 @@
+import os
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+DB_POOL_WAIT_SECONDS = Histogram(
+    'bookly_db_pool_wait_seconds',
+    'Time spent waiting to check a connection out of the database pool.',
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_CHECKOUTS = Counter(
+    'bookly_db_pool_checkouts',
+    'Connections checked out of the database pool.',
+)
+DB_POOL_TIMEOUTS = Counter(
+    'bookly_db_pool_timeouts',
+    'Checkouts that gave up after waiting pool_timeout seconds.',
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    'bookly_db_pool_checked_out',
+    'Database connections currently checked out of the pool.',
+    multiprocess_mode='livesum',
+)
+DB_READS = Counter(
+    'bookly_db_reads',
+    'Read-only sessions opened, by the database that served them.',
+    ['target'],
+)
+DB_REPLICA_HEALTHY = Gauge(
+    'bookly_db_replica_healthy',
+    'Whether a read replica is taking reads (1) or ejected (0).',
+    ['replica'],
+    multiprocess_mode='liveall',
+)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'bookly_http_request_seconds',
+    'Time to serve an HTTP request, by route template.',
+    ['method', 'route', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    'bookly_http_response_bytes',
+    'Size of HTTP response bodies, by route template.',
+    ['method', 'route'],
+    buckets=SIZE_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    'bookly_http_requests_in_progress',
+    'HTTP requests currently being served.',
+    ['method'],
+    multiprocess_mode='livesum',
+)
+
+metrics_router = APIRouter()
+
+
+def _registry() -> CollectorRegistry:
+    # Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR,
+    # so any worker answering the scrape has to aggregate all of them.
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+@metrics_router.get('/metrics', include_in_schema=False)
+async def metrics() -> Response:
+    return Response(content=generate_latest(_registry()), media_type=CONTENT_TYPE_LATEST)
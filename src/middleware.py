@@ -1,27 +1,109 @@
 import logging
+import queue
 import sys
 import time
+from logging.handlers import QueueHandler, QueueListener
 
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-# logger = logging.getLogger('uvicorn.access')
-# logger.disabled = True
+from src.compression import CompressionMiddleware
+from src.config import Config
+from src.database import PrimaryPinMiddleware
+from src.metrics import (
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS_IN_PROGRESS,
+    HTTP_RESPONSE_BYTES,
+)
+from src.profiling import QueryProfilerMiddleware, query_profiler
+from src.ratelimit import RateLimitMiddleware, RateLimitRule, rate_limiter
 
+access_logger = logging.getLogger('bookly.access')
+access_logger.setLevel(logging.INFO)
+access_logger.propagate = False
 
-def register_middleware(app: FastAPI) -> None:
-    @app.middleware('http')
-    async def custom_logging_middleware(request: Request, call_next) -> Response:
-        start_time = time.time()
-        response = await call_next(request)
-        processing_time = time.time() - start_time
+_access_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_access_log_listener: QueueListener | None = None
+
+
+def start_access_log() -> None:
+    '''Write access logs from a background thread; call once per worker process'''
+    global _access_log_listener
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    access_logger.addHandler(QueueHandler(_access_log_queue))
+    _access_log_listener = QueueListener(_access_log_queue, handler)
+    _access_log_listener.start()
+
+
+def stop_access_log() -> None:
+    global _access_log_listener
+
+    if _access_log_listener is not None:
+        _access_log_listener.stop()
+        _access_log_listener = None
+    access_logger.handlers.clear()
+
+
+class TimingMiddleware:
+    '''Records latency, response size and in-flight requests per route template'''
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
 
-        message = f'✅ Completed in {processing_time:.2f}s'
-        print(message)
-        sys.stdout.flush()
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
 
-        return response
+        method = scope['method']
+        status_code = 500
+        response_bytes = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_bytes
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            elif message['type'] == 'http.response.body':
+                response_bytes += len(message.get('body', b''))
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter_ns()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = (time.perf_counter_ns() - start) / 1e9
+            in_progress.dec()
+
+            # The router stores the matched route on the shared scope; labelling
+            # by its template keeps metric cardinality bounded.
+            route = scope.get('route')
+            route_path = getattr(route, 'path', 'unmatched')
+            HTTP_REQUEST_SECONDS.labels(method, route_path, status_code).observe(elapsed)
+            HTTP_RESPONSE_BYTES.labels(method, route_path).observe(response_bytes)
+            access_logger.info(
+                '%s %s %s %.2fms %sB', method, scope['path'], status_code, elapsed * 1000, response_bytes
+            )
+
+
+def register_middleware(app: FastAPI) -> None:
+    # Innermost: pinning only needs to wrap the route handlers.
+    if Config.DATABASE_REPLICA_URLS:
+        app.add_middleware(PrimaryPinMiddleware, pin_seconds=Config.DB_PRIMARY_PIN_SECONDS)
+
+    # Inside CORS and TrustedHost: rejected hosts are not counted and
+    # 429 responses still get CORS headers.
+    if Config.RATE_LIMIT_ENABLED:
+        app.add_middleware(
+            RateLimitMiddleware,
+            limiter=rate_limiter,
+            rule=RateLimitRule('ip', Config.RATE_LIMIT_DEFAULT, Config.RATE_LIMIT_WINDOW),
+        )
 
     app.add_middleware(
         CORSMiddleware,
@@ -35,3 +117,12 @@ def register_middleware(app: FastAPI) -> None:
         TrustedHostMiddleware,
         allowed_hosts=['localhost', '127.0.0.1'],
     )
+
+    if Config.QUERY_PROFILER_ENABLED:
+        app.add_middleware(QueryProfilerMiddleware, profiler=query_profiler)
+
+    # Inside TimingMiddleware so response sizes are recorded as sent.
+    if Config.COMPRESSION_ENABLED:
+        app.add_middleware(CompressionMiddleware, minimum_size=Config.COMPRESSION_MIN_SIZE)
+
+    app.add_middleware(TimingMiddleware)
@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, BigInteger
+from sqlmodel import TIMESTAMP, Column, Field, SQLModel
+
+
+class OutboxMessage(SQLModel, table=True):
+    __tablename__ = 'outbox'
+
+    id: int | None = Field(default=None, sa_column=Column(BigInteger, primary_key=True, autoincrement=True))
+    topic: str
+    payload: dict = Field(sa_column=Column(JSON, nullable=False))
+    created_at: datetime = Field(sa_column=Column(TIMESTAMP, default=datetime.utcnow))
+
+    def __repr__(self) -> str:
+        return f'<OutboxMessage {self.id} {self.topic}>'
@@ -0,0 +1,95 @@
+'''Drains the outbox table to the mail queue.
+
+Run one or more of these next to the API:
+
+    python -m src.outbox.relay
+
+Each batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+relays never pick the same rows, and rows are deleted in the same
+transaction once they are handed over. A crash between the hand-over
+and the commit sends those messages again: delivery is at least once.
+'''
+import asyncio
+import logging
+from typing import Callable
+
+from sqlalchemy import delete
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.celery_tasks import queue_email
+from src.config import Config
+from src.database import async_session_maker, close_db
+from src.outbox.models import OutboxMessage
+from src.outbox.service import EMAIL_TOPIC
+
+logger = logging.getLogger(__name__)
+
+HANDLERS: dict[str, Callable[[dict], None]] = {
+    EMAIL_TOPIC: lambda payload: queue_email(**payload),
+}
+
+
+def dispatch(messages: list[OutboxMessage]) -> list[int]:
+    '''Hand messages over in order; return the ids that made it'''
+    dispatched = []
+    for message in messages:
+        handler = HANDLERS.get(message.topic)
+        if handler is None:
+            logger.error('No outbox handler for topic %s, dropping message %s.', message.topic, message.id)
+        else:
+            try:
+                handler(message.payload)
+            except Exception:
+                logger.exception('Outbox message %s failed, will retry.', message.id)
+                break
+        dispatched.append(message.id)
+    return dispatched
+
+
+async def relay_batch(session: AsyncSession, batch_size: int) -> int:
+    async with session.begin():
+        statement = (
+            select(OutboxMessage)
+            .order_by(OutboxMessage.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        messages = list((await session.exec(statement)).all())
+        if not messages:
+            return 0
+
+        # The queue client is synchronous; keep it off the event loop.
+        dispatched = await asyncio.to_thread(dispatch, messages)
+        if dispatched:
+            await session.exec(delete(OutboxMessage).where(OutboxMessage.id.in_(dispatched)))
+
+    return len(dispatched)
+
+
+async def run_relay() -> None:
+    logger.info('Outbox relay started.')
+    while True:
+        try:
+            async with async_session_maker() as session:
+                relayed = await relay_batch(session, Config.OUTBOX_BATCH_SIZE)
+        except Exception as ex:
+            logger.warning('Outbox relay error: %s', ex)
+            relayed = 0
+
+        # A full batch means more may be waiting; after a short or failed
+        # one, wait before polling again.
+        if relayed < Config.OUTBOX_BATCH_SIZE:
+            await asyncio.sleep(Config.OUTBOX_POLL_INTERVAL)
+
+
+async def main() -> None:
+    try:
+        await run_relay()
+    finally:
+        await close_db()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
@@ -0,0 +1,20 @@
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.outbox.models import OutboxMessage
+
+EMAIL_TOPIC = 'email'
+
+
+def add_email(
+    session: AsyncSession, recipients: list[str], subject: str, template_name: str, context: dict
+) -> None:
+    '''Stage an email in the caller's transaction; the relay queues it after commit'''
+    session.add(OutboxMessage(
+        topic=EMAIL_TOPIC,
+        payload={
+            'recipients': recipients,
+            'subject': subject,
+            'template_name': template_name,
+            'context': context,
+        },
+    ))
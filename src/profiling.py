@@ -0,0 +1,185 @@
+import logging
+import random
+import re
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine, ExecutionContext
+from sqlalchemy.engine.interfaces import DBAPICursor
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+MAX_FINGERPRINTS = 1000
+MAX_RECENT_EVENTS = 100
+
+_WHITESPACE = re.compile(r'\s+')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_VALUES_ROWS = re.compile(r'(VALUES \([^)]*\))(?:, \([^)]*\))+')
+_IN_LISTS = re.compile(r'IN \((?:[^()]|\([^()]*\))*\)')
+
+
+def fingerprint(statement: str) -> str:
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    statement = _LITERALS.sub('?', statement)
+    statement = _VALUES_ROWS.sub(r'\1, ...', statement)
+    return _IN_LISTS.sub('IN (...)', statement)
+
+
+@dataclass
+class QueryStats:
+    calls: int = 0
+    total_ns: int = 0
+    max_ns: int = 0
+    rows: int = 0
+    routes: Counter = field(default_factory=Counter)
+
+    def to_dict(self, statement: str) -> dict:
+        return {
+            'statement': statement,
+            'calls': self.calls,
+            'total_ms': self.total_ns / 1e6,
+            'mean_ms': self.total_ns / self.calls / 1e6,
+            'max_ms': self.max_ns / 1e6,
+            'rows': self.rows,
+            'routes': dict(self.routes.most_common(5)),
+        }
+
+
+@dataclass
+class RequestProfile:
+    scope: Scope
+    queries: Counter = field(default_factory=Counter)
+
+    @property
+    def route(self) -> str:
+        return getattr(self.scope.get('route'), 'path', 'unmatched')
+
+
+_current_request: ContextVar[RequestProfile | None] = ContextVar('query_profile', default=None)
+
+
+class QueryProfiler:
+    '''Opt-in per-statement profiling through SQLAlchemy cursor events.
+
+    Only sampled requests are profiled; nothing is attached to the engine
+    unless attach() is called, so a disabled profiler costs nothing.
+    '''
+
+    def __init__(self, sample_rate: float, slow_query_ms: float, n_plus_one_threshold: int) -> None:
+        self.sample_rate = sample_rate
+        self.slow_query_ns = slow_query_ms * 1e6
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.enabled = False
+        self.stats: dict[str, QueryStats] = {}
+        self.slow_queries: deque = deque(maxlen=MAX_RECENT_EVENTS)
+        self.n_plus_one: deque = deque(maxlen=MAX_RECENT_EVENTS)
+        self._fingerprints: dict[str, str] = {}
+
+    def attach(self, engine: Engine) -> None:
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        self.enabled = True
+
+    def sample(self) -> bool:
+        return random.random() < self.sample_rate
+
+    def end_request(self, profile: RequestProfile) -> None:
+        for statement, calls in profile.queries.items():
+            if calls >= self.n_plus_one_threshold:
+                self.n_plus_one.append({'route': profile.route, 'statement': statement, 'calls': calls})
+                logger.warning('Possible N+1 on %s: %s queries of %s', profile.route, calls, statement)
+
+    def report(self, limit: int) -> dict:
+        top = sorted(self.stats.items(), key=lambda item: item[1].total_ns, reverse=True)[:limit]
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'top_queries': [stats.to_dict(statement) for statement, stats in top],
+            'slow_queries': list(self.slow_queries),
+            'n_plus_one': list(self.n_plus_one),
+        }
+
+    def _fingerprint(self, statement: str) -> str:
+        result = self._fingerprints.get(statement)
+        if result is None:
+            result = fingerprint(statement)
+            if len(self._fingerprints) < MAX_FINGERPRINTS:
+                self._fingerprints[statement] = result
+        return result
+
+    def _before_cursor_execute(
+        self,
+        conn: Connection,
+        cursor: DBAPICursor,
+        statement: str,
+        parameters: object,
+        context: ExecutionContext,
+        executemany: bool,
+    ) -> None:
+        if _current_request.get() is not None:
+            conn.info.setdefault('query_start_ns', []).append(time.perf_counter_ns())
+
+    def _after_cursor_execute(
+        self,
+        conn: Connection,
+        cursor: DBAPICursor,
+        statement: str,
+        parameters: object,
+        context: ExecutionContext,
+        executemany: bool,
+    ) -> None:
+        profile = _current_request.get()
+        if profile is None or not conn.info.get('query_start_ns'):
+            return
+
+        elapsed = time.perf_counter_ns() - conn.info['query_start_ns'].pop()
+        statement = self._fingerprint(statement)
+        profile.queries[statement] += 1
+
+        stats = self.stats.get(statement)
+        if stats is None:
+            if len(self.stats) >= MAX_FINGERPRINTS:
+                return
+            stats = self.stats[statement] = QueryStats()
+
+        stats.calls += 1
+        stats.total_ns += elapsed
+        stats.max_ns = max(stats.max_ns, elapsed)
+        stats.rows += max(cursor.rowcount, 0)
+        stats.routes[profile.route] += 1
+
+        if elapsed >= self.slow_query_ns:
+            self.slow_queries.append({'route': profile.route, 'statement': statement, 'ms': elapsed / 1e6})
+            logger.warning('Slow query on %s (%.1fms): %s', profile.route, elapsed / 1e6, statement)
+
+
+class QueryProfilerMiddleware:
+    def __init__(self, app: ASGIApp, profiler: QueryProfiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or not self.profiler.sample():
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope)
+        token = _current_request.set(profile)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_request.reset(token)
+            self.profiler.end_request(profile)
+
+
+query_profiler = QueryProfiler(
+    sample_rate=Config.QUERY_PROFILER_SAMPLE_RATE,
+    slow_query_ms=Config.QUERY_PROFILER_SLOW_MS,
+    n_plus_one_threshold=Config.QUERY_PROFILER_N_PLUS_ONE,
+)
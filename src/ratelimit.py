@@ -0,0 +1,263 @@
+import logging
+import math
+import time
+from dataclasses import dataclass
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from src.cache import TTLCache
+from src.config import Config
+from src.errors import RATE_LIMITED_DETAIL, RateLimitExceeded
+from src.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_PREFIX = 'ratelimit:'
+# Workers lease up to limit / LEASE_FRACTION hits at a time and hold them
+# for at most window / LEASE_FRACTION seconds.
+LEASE_FRACTION = 10
+
+# Sliding window counter: the previous fixed window is weighted by how much
+# of it still overlaps the sliding window. First gives back ARGV[5] unused
+# hits of an expired lease to the window KEYS[3] charged them to, then
+# grants up to ARGV[4] hits at once and returns
+# {granted, remaining, retry_ms, reset_ms}.
+SLIDING_WINDOW_SCRIPT = '''
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local wanted = tonumber(ARGV[4])
+local refund = tonumber(ARGV[5])
+if refund > 0 then
+    local charged = tonumber(redis.call('GET', KEYS[3]) or '0')
+    if charged > 0 then
+        redis.call('DECRBY', KEYS[3], math.min(refund, charged))
+    end
+end
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local elapsed = now % window
+local reset = window - elapsed
+local used = previous * reset / window + current
+local available = math.floor(limit - used)
+if available < 1 then
+    local retry = reset
+    if current < limit and previous > 0 then
+        retry = math.min(reset, math.ceil((used + 1 - limit) * window / previous))
+    end
+    return {0, 0, retry, reset}
+end
+local granted = math.min(wanted, available)
+redis.call('INCRBY', KEYS[1], granted)
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {granted, available - granted, 0, reset}
+'''
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    limit: int
+    window: int
+
+    @property
+    def lease_size(self) -> int:
+        return max(1, self.limit // LEASE_FRACTION)
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float
+    retry_after: float = 0.0
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(max(self.remaining, 0)),
+            'X-RateLimit-Reset': str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers['Retry-After'] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+@dataclass
+class _Lease:
+    size: int
+    tokens: int
+    remaining: int
+    reset_at: float
+    granted_at: float
+    expires_at: float
+    window_index: int
+    blocked_until: float = 0.0
+
+    def next_size(self, rule: RateLimitRule, now: float) -> int:
+        '''Hits this worker expects to serve over the next lease period'''
+        used = self.size - self.tokens
+        elapsed = max(now - self.granted_at, 0.001)
+        expected = math.ceil(used / elapsed * rule.window / LEASE_FRACTION)
+        return min(max(expected, 1), rule.lease_size)
+
+
+@dataclass
+class _TokenBucket:
+    tokens: float
+    updated_at: float
+
+
+class RateLimiter:
+    '''Sliding-window rate limits shared by all workers through Redis.
+
+    Each worker leases a slice of a key's remaining allowance in one Lua
+    call and serves it from memory, and remembers denials until their
+    Retry-After, so most hits never leave the process. A key's first lease
+    covers only the hit at hand; later ones are sized from the rate the
+    previous lease was used at, and whatever it left unused is refunded
+    when it is renewed. If Redis is unreachable, a per-worker token bucket
+    with the same rate takes over.
+    '''
+
+    def __init__(self, client: Redis, enabled: bool, max_keys: int) -> None:
+        self.enabled = enabled
+        self._script = client.register_script(SLIDING_WINDOW_SCRIPT)
+        self._leases: TTLCache[_Lease] = TTLCache(max_keys)
+        self._buckets: TTLCache[_TokenBucket] = TTLCache(max_keys)
+
+    async def hit(self, rule: RateLimitRule, identity: str) -> RateLimitResult:
+        key = f'{rule.name}:{identity}'
+        now = time.time()
+
+        lease = self._leases.get(key)
+        if lease is not None:
+            if lease.tokens > 0 and lease.expires_at > now:
+                lease.tokens -= 1
+                return RateLimitResult(True, rule.limit, lease.remaining + lease.tokens, lease.reset_at - now)
+            if lease.blocked_until > now:
+                return RateLimitResult(False, rule.limit, 0, lease.reset_at - now, lease.blocked_until - now)
+
+        wanted = 1 if lease is None else lease.next_size(rule, now)
+        try:
+            granted, remaining, retry_ms, reset_ms = await self._acquire(rule, key, now, wanted, lease)
+        except RedisError as ex:
+            logger.warning('Rate limiter falling back to local buckets: %s', ex)
+            return self._local_hit(rule, key, now)
+
+        # Kept for a window so the next lease can refund it and learn its rate.
+        reset_at = now + reset_ms / 1000
+        window_index = self._window_index(rule, now)
+        if not granted:
+            blocked_until = now + retry_ms / 1000
+            self._leases.set(key, _Lease(0, 0, 0, reset_at, now, now, window_index, blocked_until), now + rule.window)
+            return RateLimitResult(False, rule.limit, 0, reset_ms / 1000, retry_ms / 1000)
+
+        expires_at = min(reset_at, now + rule.window / LEASE_FRACTION)
+        lease = _Lease(granted, granted - 1, remaining, reset_at, now, expires_at, window_index)
+        self._leases.set(key, lease, now + rule.window)
+        return RateLimitResult(True, rule.limit, remaining + lease.tokens, reset_ms / 1000)
+
+    async def enforce(self, rule: RateLimitRule, identity: str, request: Request) -> None:
+        '''Raise RateLimitExceeded when over the limit; otherwise report it on the response'''
+        if not self.enabled:
+            return
+
+        result = await self.hit(rule, identity)
+        if not result.allowed:
+            raise RateLimitExceeded(result.headers)
+
+        # RateLimitMiddleware sends the tightest limit seen on this request.
+        current = getattr(request.state, 'rate_limit', None)
+        if current is None or result.remaining < current.remaining:
+            request.state.rate_limit = result
+
+    async def _acquire(
+        self, rule: RateLimitRule, key: str, now: float, wanted: int, expired: _Lease | None
+    ) -> list[int]:
+        window_index = self._window_index(rule, now)
+        refund = expired.tokens if expired is not None else 0
+        refund_index = expired.window_index if expired is not None else window_index
+        return await self._script(
+            keys=[
+                f'{RATE_LIMIT_PREFIX}{key}:{window_index}',
+                f'{RATE_LIMIT_PREFIX}{key}:{window_index - 1}',
+                f'{RATE_LIMIT_PREFIX}{key}:{refund_index}',
+            ],
+            args=[rule.limit, rule.window * 1000, int(now * 1000), wanted, refund],
+        )
+
+    @staticmethod
+    def _window_index(rule: RateLimitRule, now: float) -> int:
+        return int(now * 1000) // (rule.window * 1000)
+
+    def _local_hit(self, rule: RateLimitRule, key: str, now: float) -> RateLimitResult:
+        rate = rule.limit / rule.window
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = _TokenBucket(rule.limit, now)
+        else:
+            bucket.tokens = min(rule.limit, bucket.tokens + (now - bucket.updated_at) * rate)
+            bucket.updated_at = now
+        self._buckets.set(key, bucket, now + rule.window)
+
+        if bucket.tokens < 1:
+            return RateLimitResult(False, rule.limit, 0, rule.window, (1 - bucket.tokens) / rate)
+
+        bucket.tokens -= 1
+        return RateLimitResult(True, rule.limit, int(bucket.tokens), (rule.limit - bucket.tokens) / rate)
+
+
+def client_ip(scope: Scope) -> str:
+    client = scope.get('client')
+    return client[0] if client else 'unknown'
+
+
+class RateLimit:
+    '''Route dependency applying a rule per client IP'''
+
+    def __init__(self, rule: RateLimitRule) -> None:
+        self.rule = rule
+
+    async def __call__(self, request: Request) -> None:
+        await rate_limiter.enforce(self.rule, client_ip(request.scope), request)
+
+
+class RateLimitMiddleware:
+    '''Applies a default per-IP rule to every request and adds X-RateLimit-* headers'''
+
+    def __init__(self, app: ASGIApp, limiter: 'RateLimiter', rule: RateLimitRule) -> None:
+        self.app = app
+        self.limiter = limiter
+        self.rule = rule
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        result = await self.limiter.hit(self.rule, client_ip(scope))
+        if not result.allowed:
+            response = JSONResponse(status_code=429, content=RATE_LIMITED_DETAIL, headers=result.headers)
+            await response(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                route_result = scope.get('state', {}).get('rate_limit')
+                headers = MutableHeaders(scope=message)
+                for name, value in (route_result or result).headers.items():
+                    headers.setdefault(name, value)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+rate_limiter = RateLimiter(redis_client, enabled=Config.RATE_LIMIT_ENABLED, max_keys=Config.RATE_LIMIT_LOCAL_KEYS)
@@ -1,16 +1,36 @@
-import aioredis
-
+from redis.asyncio import BlockingConnectionPool, Redis
 from src.config import Config
 
-JTI_EXPIRY = 3600
-
-token_blocklist = aioredis.from_url(Config.REDIS_URL)
+REVOKED_JTI_CHANNEL = 'bookly:revoked_jti'
+USER_INVALIDATION_CHANNEL = 'bookly:user_invalidated'
+CATALOG_GENERATION_CHANNEL = 'bookly:catalog_generation'
+SESSION_ENDED_CHANNEL = 'bookly:session_ended'
+USER_EPOCH_CHANNEL = 'bookly:user_epoch'
 
+# Callers wait up to REDIS_POOL_TIMEOUT for a free connection instead of
+# opening an unbounded number of them under load.
+redis_pool = BlockingConnectionPool.from_url(
+    Config.REDIS_URL,
+    max_connections=Config.REDIS_MAX_CONNECTIONS,
+    timeout=Config.REDIS_POOL_TIMEOUT,
+    socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=Config.REDIS_SOCKET_TIMEOUT,
+    health_check_interval=Config.REDIS_HEALTH_CHECK_INTERVAL,
+)
+redis_client = Redis(connection_pool=redis_pool)
 
-async def add_jit_to_blocklist(jti: str) -> None:
-    await token_blocklist.set(name=jti, value='', ex=JTI_EXPIRY)
+# A subscription blocks on reads until a message arrives, which the socket
+# timeout above would turn into a reconnect every few seconds; it gets its
+# own connection outside the pool with TCP keepalive instead.
+redis_subscriber = Redis.from_url(
+    Config.REDIS_URL,
+    socket_connect_timeout=Config.REDIS_SOCKET_TIMEOUT,
+    socket_keepalive=True,
+    health_check_interval=Config.REDIS_HEALTH_CHECK_INTERVAL,
+)
 
 
-async def is_jit_in_blocklist(jti: str) -> bool:
-    jti = await token_blocklist.get(jti)
-    return jti is not None
+async def close_redis() -> None:
+    await redis_subscriber.aclose()
+    await redis_client.aclose()
+    await redis_pool.aclose()
@@ -0,0 +1,76 @@
+import uuid
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import CheckConstraint, ForeignKey, Index, UniqueConstraint
+from sqlmodel import TIMESTAMP, Column, Field, Relationship, SQLModel
+
+from src.auth.models import User
+
+if TYPE_CHECKING:
+    from src.books.models import Book
+
+MIN_RATING = 1
+MAX_RATING = 5
+# Top-rated ordering shrinks each average towards PRIOR_MEAN as if every
+# book already had PRIOR_WEIGHT reviews of that rating, so a single
+# five-star review does not outrank hundreds of good ones.
+PRIOR_MEAN = 3.0
+PRIOR_WEIGHT = 5
+
+
+class Review(SQLModel, table=True):
+    __tablename__ = 'reviews'
+    __table_args__ = (
+        UniqueConstraint('book_uid', 'user_uid', name='uq_reviews_book_user'),
+        CheckConstraint(f'rating BETWEEN {MIN_RATING} AND {MAX_RATING}', name='ck_reviews_rating'),
+    )
+
+    uid: uuid.UUID = Field(nullable=False, primary_key=True, default_factory=uuid.uuid4)
+    book_uid: uuid.UUID = Field(sa_column=Column(ForeignKey('books.uid', ondelete='CASCADE'), nullable=False))
+    user_uid: uuid.UUID = Field(sa_column=Column(ForeignKey('users.uid', ondelete='CASCADE'), nullable=False))
+    rating: int
+    review_text: str
+    created_at: datetime = Field(sa_column=Column(TIMESTAMP, default=datetime.utcnow))
+    updated_at: datetime = Field(sa_column=Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow))
+
+    book: Optional['Book'] = Relationship(back_populates='reviews', sa_relationship_kwargs={'lazy': 'raise'})
+    user: Optional[User] = Relationship(sa_relationship_kwargs={'lazy': 'raise'})
+
+    def __repr__(self) -> str:
+        return f'<Review {self.rating} for {self.book_uid}>'
+
+
+class BookRating(SQLModel, table=True):
+    '''Review aggregates for one book, kept in step with reviews on every write'''
+
+    __tablename__ = 'book_ratings'
+
+    book_uid: uuid.UUID = Field(sa_column=Column(ForeignKey('books.uid', ondelete='CASCADE'), primary_key=True))
+    review_count: int = 0
+    rating_sum: int = 0
+    rating_1: int = 0
+    rating_2: int = 0
+    rating_3: int = 0
+    rating_4: int = 0
+    rating_5: int = 0
+    average_rating: float | None = None
+    weighted_rating: float = PRIOR_MEAN
+
+    @property
+    def histogram(self) -> dict[int, int]:
+        return {rating: getattr(self, f'rating_{rating}') for rating in range(MIN_RATING, MAX_RATING + 1)}
+
+    def __repr__(self) -> str:
+        return f'<BookRating {self.book_uid} {self.average_rating}>'
+
+
+# Serves a book's reviews newest first with keyset pagination.
+Index('ix_reviews_book_created_at_uid', Review.book_uid, Review.created_at.desc(), Review.uid.desc())
+# Top-rated listing walks this index and stops after one page.
+Index(
+    'ix_book_ratings_weighted_rating',
+    BookRating.weighted_rating.desc(),
+    BookRating.book_uid.desc(),
+    postgresql_where=BookRating.review_count > 0,
+)
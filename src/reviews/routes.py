@@ -0,0 +1,98 @@
+import logging
+import uuid
+
+from fastapi import APIRouter, Depends, Query, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.auth.dependencies import RoleChecker, get_current_user
+from src.auth.schemas import CurrentUserModel
+from src.database import get_read_session, get_session
+from src.errors import ReviewNotFound
+from src.reviews.schemas import (
+    BookRatingModel,
+    ReviewCreateModel,
+    ReviewModel,
+    ReviewPageModel,
+    ReviewUpdateModel,
+    TopRatedPageModel,
+)
+from src.reviews.service import ReviewService
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+review_router = APIRouter()
+review_service = ReviewService()
+role_checker = RoleChecker(allowed_roles=['admin', 'user'])
+
+logger = logging.getLogger(__name__)
+
+
+@review_router.get('/top_rated', response_model=TopRatedPageModel)
+async def get_top_rated_books(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
+) -> dict:
+    items, next_cursor = await review_service.get_top_rated_page(session, limit, cursor)
+    return {'items': items, 'next_cursor': next_cursor}
+
+
+@review_router.get('/books/{book_uid}', response_model=ReviewPageModel)
+async def get_book_reviews(
+    book_uid: uuid.UUID,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
+) -> dict:
+    reviews, next_cursor = await review_service.get_reviews_page(book_uid, session, limit, cursor)
+    return {'items': reviews, 'next_cursor': next_cursor}
+
+
+@review_router.get('/books/{book_uid}/rating', response_model=BookRatingModel)
+async def get_book_rating(
+    book_uid: uuid.UUID, session: AsyncSession = Depends(get_read_session)
+) -> BookRatingModel:
+    return await review_service.get_book_rating(book_uid, session)
+
+
+@review_router.post(
+    '/books/{book_uid}',
+    status_code=status.HTTP_201_CREATED,
+    response_model=ReviewModel,
+    dependencies=[Depends(role_checker)],
+)
+async def create_review(
+    book_uid: uuid.UUID,
+    review_data: ReviewCreateModel,
+    current_user: CurrentUserModel = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+) -> ReviewModel:
+    review = await review_service.create_review(book_uid, current_user.uid, review_data, session)
+    logger.info('User %s reviewed book %s.', current_user.uid, book_uid)
+    return review
+
+
+@review_router.patch('/{review_uid}', response_model=ReviewModel, dependencies=[Depends(role_checker)])
+async def update_review(
+    review_uid: uuid.UUID,
+    update_data: ReviewUpdateModel,
+    current_user: CurrentUserModel = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+) -> ReviewModel:
+    review = await review_service.update_review(review_uid, current_user.uid, update_data, session)
+    if review is None:
+        raise ReviewNotFound
+    return review
+
+
+@review_router.delete('/{review_uid}', status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(role_checker)])
+async def delete_review(
+    review_uid: uuid.UUID,
+    current_user: CurrentUserModel = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+) -> None:
+    # Admins may remove any review; everyone else only their own.
+    author_uid = None if current_user.role == 'admin' else current_user.uid
+    if not await review_service.delete_review(review_uid, session, author_uid):
+        raise ReviewNotFound
@@ -0,0 +1,42 @@
+import uuid
+from datetime import datetime
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from src.books.schemas import BookModel, BookRatingSummaryModel, BookReviewModel
+from src.reviews.models import MAX_RATING, MIN_RATING
+
+
+class ReviewModel(BookReviewModel):
+    book_uid: uuid.UUID
+    updated_at: datetime
+
+
+class ReviewPageModel(BaseModel):
+    items: List[ReviewModel]
+    next_cursor: str | None = None
+
+
+class ReviewCreateModel(BaseModel):
+    rating: int = Field(ge=MIN_RATING, le=MAX_RATING)
+    review_text: str = Field(max_length=5000)
+
+
+class ReviewUpdateModel(BaseModel):
+    rating: int | None = Field(None, ge=MIN_RATING, le=MAX_RATING)
+    review_text: str | None = Field(None, max_length=5000)
+
+
+class BookRatingModel(BookRatingSummaryModel):
+    weighted_rating: float
+
+
+class TopRatedBookModel(BaseModel):
+    book: BookModel
+    rating: BookRatingModel
+
+
+class TopRatedPageModel(BaseModel):
+    items: List[TopRatedBookModel]
+    next_cursor: str | None = None
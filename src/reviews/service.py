@@ -0,0 +1,183 @@
+import uuid
+from collections import Counter
+from typing import List
+
+from sqlalchemy import Float, cast, delete, func, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import desc, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.books.models import Book
+from src.books.utils import decode_cursor, encode_cursor
+from src.errors import BookNotFound, ReviewAlreadyExists
+from src.reviews.models import PRIOR_MEAN, PRIOR_WEIGHT, BookRating, Review
+from src.reviews.schemas import ReviewCreateModel, ReviewUpdateModel
+from src.reviews.utils import decode_rating_cursor, encode_rating_cursor
+
+
+def weighted_rating(rating_sum: int, review_count: int) -> float:
+    return (rating_sum + PRIOR_MEAN * PRIOR_WEIGHT) / (review_count + PRIOR_WEIGHT)
+
+
+class ReviewService:
+    '''Reviews and their per-book aggregates.
+
+    Every write adjusts the book's BookRating row by the change it makes,
+    in the same transaction, so reads never aggregate over reviews.
+    '''
+
+    async def get_reviews_page(
+        self, book_uid: uuid.UUID, session: AsyncSession, limit: int, cursor: str | None = None
+    ) -> tuple[List[Review], str | None]:
+        # Fetch one extra row to know whether another page exists.
+        statement = (
+            select(Review)
+            .where(Review.book_uid == book_uid)
+            .order_by(desc(Review.created_at), desc(Review.uid))
+            .limit(limit + 1)
+        )
+        if cursor is not None:
+            created_at, uid = decode_cursor(cursor)
+            statement = statement.where(tuple_(Review.created_at, Review.uid) < (created_at, uid))
+
+        reviews = (await session.exec(statement)).all()
+        if len(reviews) <= limit:
+            return reviews, None
+
+        reviews = reviews[:limit]
+        return reviews, encode_cursor(reviews[-1].created_at, reviews[-1].uid)
+
+    async def get_book_rating(self, book_uid: uuid.UUID, session: AsyncSession) -> BookRating:
+        rating = await session.get(BookRating, book_uid)
+        if rating is not None:
+            return rating
+
+        await self._ensure_book_exists(book_uid, session)
+        return BookRating(book_uid=book_uid)
+
+    async def get_top_rated_page(
+        self, session: AsyncSession, limit: int, cursor: str | None = None
+    ) -> tuple[List[dict], str | None]:
+        statement = (
+            select(Book, BookRating)
+            .join(BookRating, BookRating.book_uid == Book.uid)
+            .where(BookRating.review_count > 0)
+            .order_by(desc(BookRating.weighted_rating), desc(BookRating.book_uid))
+            .limit(limit + 1)
+        )
+        if cursor is not None:
+            rating, book_uid = decode_rating_cursor(cursor)
+            statement = statement.where(tuple_(BookRating.weighted_rating, BookRating.book_uid) < (rating, book_uid))
+
+        rows = (await session.exec(statement)).all()
+        items = [{'book': book, 'rating': rating} for book, rating in rows[:limit]]
+        if len(rows) <= limit:
+            return items, None
+
+        last = items[-1]['rating']
+        return items, encode_rating_cursor(last.weighted_rating, last.book_uid)
+
+    async def create_review(
+        self, book_uid: uuid.UUID, user_uid: uuid.UUID, review_data: ReviewCreateModel, session: AsyncSession
+    ) -> Review:
+        await self._ensure_book_exists(book_uid, session)
+
+        review = Review(book_uid=book_uid, user_uid=user_uid, **review_data.model_dump())
+        session.add(review)
+        try:
+            await session.flush()
+        except IntegrityError as ex:
+            await session.rollback()
+            raise ReviewAlreadyExists from ex
+
+        await self._apply_rating_change(book_uid, session, added=review.rating)
+        await session.commit()
+        return review
+
+    async def update_review(
+        self, review_uid: uuid.UUID, user_uid: uuid.UUID, update_data: ReviewUpdateModel, session: AsyncSession
+    ) -> Review | None:
+        statement = select(Review).where(Review.uid == review_uid, Review.user_uid == user_uid).with_for_update()
+        review = (await session.exec(statement)).first()
+        if review is None:
+            return None
+
+        old_rating = review.rating
+        for key, value in update_data.model_dump(exclude_unset=True, exclude_none=True).items():
+            setattr(review, key, value)
+        session.add(review)
+
+        if review.rating != old_rating:
+            await self._apply_rating_change(review.book_uid, session, added=review.rating, removed=old_rating)
+        await session.commit()
+        return review
+
+    async def delete_review(
+        self, review_uid: uuid.UUID, session: AsyncSession, user_uid: uuid.UUID | None = None
+    ) -> bool:
+        '''Delete a review; user_uid restricts it to that author, None allows any'''
+        statement = delete(Review).where(Review.uid == review_uid)
+        if user_uid is not None:
+            statement = statement.where(Review.user_uid == user_uid)
+        statement = statement.returning(Review.book_uid, Review.rating).execution_options(synchronize_session=False)
+
+        deleted = (await session.exec(statement)).first()
+        if deleted is None:
+            await session.rollback()
+            return False
+
+        await self._apply_rating_change(deleted.book_uid, session, removed=deleted.rating)
+        await session.commit()
+        return True
+
+    async def _ensure_book_exists(self, book_uid: uuid.UUID, session: AsyncSession) -> None:
+        exists = (await session.exec(select(Book.uid).where(Book.uid == book_uid))).first()
+        if exists is None:
+            raise BookNotFound
+
+    async def _apply_rating_change(
+        self, book_uid: uuid.UUID, session: AsyncSession, added: int | None = None, removed: int | None = None
+    ) -> None:
+        histogram = Counter()
+        if added is not None:
+            histogram[added] += 1
+        if removed is not None:
+            histogram[removed] -= 1
+        count_delta = sum(histogram.values())
+        values = self._aggregate_values(count_delta, (added or 0) - (removed or 0), histogram)
+
+        if removed is not None:
+            statement = update(BookRating).where(BookRating.book_uid == book_uid).values(**values)
+        else:
+            # The first review of a book creates its row; later ones update it
+            # under the row lock taken by ON CONFLICT.
+            statement = (
+                insert(BookRating)
+                .values(
+                    book_uid=book_uid,
+                    review_count=1,
+                    rating_sum=added,
+                    average_rating=float(added),
+                    weighted_rating=weighted_rating(added, 1),
+                    **{f'rating_{added}': 1},
+                )
+                .on_conflict_do_update(index_elements=[BookRating.book_uid], set_=values)
+            )
+        await session.exec(statement.execution_options(synchronize_session=False))
+
+    def _aggregate_values(self, count_delta: int, sum_delta: int, histogram: Counter) -> dict:
+        review_count = BookRating.review_count + count_delta
+        rating_sum = BookRating.rating_sum + sum_delta
+        total = cast(rating_sum, Float)
+        values = {
+            'review_count': review_count,
+            'rating_sum': rating_sum,
+            'average_rating': total / func.nullif(review_count, 0),
+            'weighted_rating': (total + PRIOR_MEAN * PRIOR_WEIGHT) / (review_count + PRIOR_WEIGHT),
+        }
+        for rating, delta in histogram.items():
+            if delta:
+                column = getattr(BookRating, f'rating_{rating}')
+                values[column.key] = column + delta
+        return values
@@ -0,0 +1,23 @@
+import base64
+import binascii
+import json
+import uuid
+
+from src.errors import InvalidCursor
+
+
+def encode_rating_cursor(weighted_rating: float, book_uid: uuid.UUID) -> str:
+    payload = json.dumps(
+        {'weighted_rating': weighted_rating, 'book_uid': str(book_uid)},
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_rating_cursor(cursor: str) -> tuple[float, uuid.UUID]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(payload['weighted_rating']), uuid.UUID(payload['book_uid'])
+    except (binascii.Error, ValueError, KeyError, TypeError) as ex:
+        raise InvalidCursor from ex
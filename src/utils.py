@@ -1,6 +1,45 @@
-from pydantic import BaseModel
+from functools import lru_cache
+from typing import List
+
+from pydantic import BaseModel, create_model
+
+from src.errors import InvalidFields
+
+MAX_FIELDSETS = 512
 
 
 class ResponseModel(BaseModel):
     message: str
     data: dict
+
+
+def parse_fields(fields: str | None, model: type[BaseModel], always: tuple[str, ...] = ('uid',)) -> tuple[str, ...] | None:
+    '''Fields named in a comma-separated fields= parameter, in model order.
+
+    Returns None when the parameter is absent, meaning every field.
+    '''
+    if not fields:
+        return None
+
+    requested = {name.strip() for name in fields.split(',') if name.strip()}
+    if not requested <= model.model_fields.keys():
+        raise InvalidFields
+
+    # A canonical order keeps one cached model and cache key per combination.
+    return tuple(name for name in model.model_fields if name in requested or name in always)
+
+
+@lru_cache(maxsize=MAX_FIELDSETS)
+def narrowed_model(model: type[BaseModel], fields: tuple[str, ...]) -> type[BaseModel]:
+    '''model restricted to fields; built once per combination since building compiles a validator'''
+    return create_model(
+        f'{model.__name__}[{",".join(fields)}]',
+        __config__=model.model_config,
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields},
+    )
+
+
+@lru_cache(maxsize=MAX_FIELDSETS)
+def narrowed_page_model(page_model: type[BaseModel], item_model: type[BaseModel]) -> type[BaseModel]:
+    '''page_model with its items swapped for item_model'''
+    return create_model(f'{page_model.__name__}[{item_model.__name__}]', __base__=page_model, items=(List[item_model], ...))
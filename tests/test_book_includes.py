@@ -0,0 +1,122 @@
+import asyncio
+import os
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import Computed, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.auth.models import User
+from src.books.models import Book
+from src.books.service import INCLUDED_REVIEWS, BookService
+from src.reviews.models import BookRating, Review
+
+# Runs against TEST_DATABASE_URL (a scratch Postgres database) when set,
+# otherwise against an in-memory SQLite database.
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL', 'sqlite+aiosqlite://')
+BOOKS = 12
+REVIEWS_PER_BOOK = INCLUDED_REVIEWS + 2
+
+if TEST_DATABASE_URL.startswith('sqlite'):
+    pytest.importorskip('aiosqlite')
+
+
+# SQLite has no full-text search column; a plain nullable one stands in.
+@compiles(TSVECTOR, 'sqlite')
+def _compile_tsvector(type_: TSVECTOR, compiler: object, **kw: object) -> str:
+    return 'TEXT'
+
+
+@compiles(Computed, 'sqlite')
+def _compile_computed(computed: Computed, compiler: object, **kw: object) -> str:
+    return ''
+
+
+async def _seed(session: AsyncSession) -> None:
+    start = datetime(2026, 1, 1)
+    users = [
+        User(
+            uid=uuid.uuid4(),
+            username=f'user{i}',
+            email=f'user{i}@example.com',
+            first_name='F',
+            last_name='L',
+            password_hash='x',
+        )
+        for i in range(REVIEWS_PER_BOOK)
+    ]
+    session.add_all(users)
+    for i in range(BOOKS):
+        book = Book(
+            title=f'Book {i}',
+            author='Author',
+            publisher='Publisher',
+            published_date=date(2020, 1, 1),
+            page_count=100,
+            language='en',
+            user_uid=users[0].uid,
+            created_at=start + timedelta(minutes=i),
+        )
+        session.add(book)
+        for j, user in enumerate(users):
+            session.add(Review(
+                book_uid=book.uid,
+                user_uid=user.uid,
+                rating=j % 5 + 1,
+                review_text='text',
+                created_at=start + timedelta(minutes=i, seconds=j),
+            ))
+        session.add(BookRating(book_uid=book.uid, review_count=REVIEWS_PER_BOOK, rating_sum=3 * REVIEWS_PER_BOOK))
+    await session.commit()
+
+
+async def _count_page_queries(limits: list[int]) -> list[int]:
+    engine = create_async_engine(TEST_DATABASE_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    statements = []
+    event.listen(engine.sync_engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    session_maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    counts = []
+    try:
+        async with session_maker() as session:
+            await _seed(session)
+
+        for limit in limits:
+            async with session_maker() as session:
+                statements.clear()
+                books, _ = await BookService().get_books_page(
+                    session, limit, includes=frozenset({'user', 'rating', 'reviews'})
+                )
+                counts.append(len(statements))
+
+                # lazy='raise' relations: touching one that was not loaded fails.
+                assert len(books) == limit
+                for book in books:
+                    assert book.user.username == 'user0'
+                    assert book.rating.review_count == REVIEWS_PER_BOOK
+                    assert len(book.reviews) == INCLUDED_REVIEWS
+                    assert [review.created_at for review in book.reviews] == sorted(
+                        (review.created_at for review in book.reviews), reverse=True
+                    )
+                    assert all(review.book_uid == book.uid for review in book.reviews)
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.drop_all)
+        await engine.dispose()
+    return counts
+
+
+def test_include_query_count_does_not_grow_with_page_size() -> None:
+    small, large = asyncio.run(_count_page_queries([2, 10]))
+
+    # One page query with user and rating joined in, one for the reviews.
+    assert small == large == 2
+
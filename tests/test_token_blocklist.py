@@ -0,0 +1,28 @@
+import asyncio
+import time
+
+from src.auth.blocklist import MemoryTokenBlocklist, create_token_blocklist
+
+
+async def _revoke_and_check() -> tuple[set[str], set[str], bool, bool]:
+    blocklist = MemoryTokenBlocklist()
+    now = time.time()
+    await blocklist.revoke('live', now + 60)
+    await blocklist.revoke('also-live', now + 60)
+    await blocklist.revoke('already-expired', now - 1)
+
+    batch = await blocklist.revoked(['live', 'unknown', 'also-live', 'already-expired'])
+    empty = await blocklist.revoked([])
+    return batch, empty, await blocklist.is_revoked('live'), await blocklist.is_revoked('already-expired')
+
+
+def test_memory_blocklist_batch_check_matches_single_checks() -> None:
+    batch, empty, live, expired = asyncio.run(_revoke_and_check())
+
+    assert batch == {'live', 'also-live'}
+    assert empty == set()
+    assert live and not expired
+
+
+def test_create_token_blocklist_memory_backend() -> None:
+    assert isinstance(create_token_blocklist('memory'), MemoryTokenBlocklist)